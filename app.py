@@ -1,5 +1,7 @@
 import streamlit as st
 import pandas as pd
+from armonic.memoria import reporte_memoria
+from armonic.llm import obtener_cliente
 # from demanda import render_forecast
 # from facturas import render_facturas
 # from proveedores import render_proveedores
@@ -27,6 +29,16 @@ pg = st.navigation([demanda,facturas,proveedores])
 
 pg.run()
 
+with st.sidebar:
+    with st.expander("🧠 Memoria de la sesión", expanded=False):
+        reporte = reporte_memoria(st.session_state)
+        st.caption(f"Total: {reporte['KB'].sum() / 1024:,.1f} MB")
+        st.dataframe(reporte, hide_index=True, column_config={"KB": st.column_config.NumberColumn(format="%.1f")})
+    cliente_llm = obtener_cliente()
+    if cliente_llm is not None:
+        with st.expander("⏱️ Latencia LLM", expanded=False):
+            st.json(cliente_llm.resumen_metricas())
+
 # if st.session_state.logged_in:
 #     pg = st.navigation(
 #         {
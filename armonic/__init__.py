@@ -0,0 +1,2 @@
+# armonic/__init__.py
+# Lógica de cálculo compartida por las páginas de Streamlit (sin dependencias de UI).
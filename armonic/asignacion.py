@@ -0,0 +1,41 @@
+# armonic/asignacion.py
+import numpy as np
+
+
+def asignar_lote(E, targets) -> np.ndarray:
+    """Reparto de mayor residuo (Hamilton) de muchos objetivos a la vez, en una pasada de NumPy.
+
+    `E`: expectativas por producto, (n,) compartidas por todos los escenarios o (S, n) una fila
+    por escenario. `targets`: (S,) unidades enteras a repartir (días, ventanas, sucursales,
+    what-if...). Devuelve una matriz (S, n) de enteros donde cada fila suma su objetivo.
+    Si una fila no tiene expectativas (todo 0) se reparte en partes iguales.
+    """
+    T = np.maximum(np.asarray(targets, dtype=np.int64).reshape(-1), 0)
+    E = np.asarray(E, dtype=np.float64)
+    if E.ndim == 1:
+        E = E[None, :]
+    S, n = len(T), E.shape[1]
+    E = np.broadcast_to(E, (S, n))
+
+    # 1) escalar cada fila para que sume su objetivo (filas sin expectativas: equitativo)
+    suma = E.sum(axis=1, keepdims=True)
+    E = np.where(suma > 0, E, 1.0)
+    scaled = E / E.sum(axis=1, keepdims=True) * T[:, None]
+
+    # 2) parte entera + cuántas unidades faltan por fila
+    alloc = np.floor(scaled)
+    frac = scaled - alloc
+    alloc = alloc.astype(np.int64)
+    restante = np.clip(T - alloc.sum(axis=1), 0, n)
+
+    # 3) +1 a los `restante` productos con mayor fracción de cada fila: argpartition con el
+    #    máximo k de todas las filas y solo esas k columnas se ordenan (nunca la fila completa)
+    k = int(restante.max()) if S else 0
+    if k > 0:
+        top = np.argpartition(-frac, k - 1, axis=1)[:, :k]
+        orden = np.argsort(-np.take_along_axis(frac, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, orden, axis=1)
+        sumar = np.arange(k) < restante[:, None]
+        filas = np.broadcast_to(np.arange(S)[:, None], top.shape)
+        alloc[filas[sumar], top[sumar]] += 1
+    return alloc
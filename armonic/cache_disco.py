@@ -0,0 +1,98 @@
+# armonic/cache_disco.py
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+def firma_archivo(path: str) -> tuple:
+    # versión de un archivo local sin leerlo (ruta, mtime, tamaño): un stat por rerun en vez de hashear el contenido
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+class CacheDisco:
+    """Cache clave -> valor JSON en SQLite, compartido entre sesiones y procesos.
+
+    Sobrevive a reinicios, expira entradas por TTL y, al pasar de `max_entradas` o de
+    `max_bytes` (tamaño total de los valores), desaloja las menos usadas recientemente (LRU).
+    """
+
+    def __init__(self, path: str, ttl_segundos: float = None, max_entradas: int = 1000, max_bytes: int = None):
+        self.path = path
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")  # lectores concurrentes no bloquean al que escribe
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " clave TEXT PRIMARY KEY, valor TEXT NOT NULL,"
+                " creado REAL NOT NULL, acceso REAL NOT NULL, tamanio INTEGER NOT NULL DEFAULT 0)"
+            )
+            columnas = {fila[1] for fila in con.execute("PRAGMA table_info(cache)")}
+            if "tamanio" not in columnas:  # caches creados antes del límite por tamaño
+                con.execute("ALTER TABLE cache ADD COLUMN tamanio INTEGER NOT NULL DEFAULT 0")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_acceso ON cache(acceso)")
+
+    @contextmanager
+    def _conectar(self):
+        # una conexión por operación: seguro entre hilos del servidor de Streamlit
+        con = sqlite3.connect(self.path, timeout=10)
+        try:
+            with con:  # commit / rollback
+                yield con
+        finally:
+            con.close()
+
+    def get(self, clave: str):
+        ahora = time.time()
+        with self._conectar() as con:
+            fila = con.execute("SELECT valor, creado FROM cache WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                return None
+            valor, creado = fila
+            if self.ttl_segundos is not None and ahora - creado > self.ttl_segundos:
+                con.execute("DELETE FROM cache WHERE clave = ?", (clave,))
+                return None
+            con.execute("UPDATE cache SET acceso = ? WHERE clave = ?", (ahora, clave))
+        return json.loads(valor)
+
+    def set(self, clave: str, valor):
+        ahora = time.time()
+        texto = json.dumps(valor, ensure_ascii=False)
+        with self._conectar() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO cache (clave, valor, creado, acceso, tamanio) VALUES (?, ?, ?, ?, ?)",
+                (clave, texto, ahora, ahora, len(texto.encode("utf-8"))),
+            )
+            self._desalojar(con, ahora)
+
+    def _desalojar(self, con, ahora):
+        if self.ttl_segundos is not None:
+            con.execute("DELETE FROM cache WHERE creado < ?", (ahora - self.ttl_segundos,))
+        con.execute(
+            "DELETE FROM cache WHERE clave IN ("
+            " SELECT clave FROM cache ORDER BY acceso DESC LIMIT -1 OFFSET ?)",
+            (self.max_entradas,),
+        )
+        if self.max_bytes is not None:
+            # se conservan las más recientes mientras el tamaño acumulado entre en max_bytes
+            con.execute(
+                "DELETE FROM cache WHERE clave IN ("
+                " SELECT clave FROM ("
+                "  SELECT clave, SUM(tamanio) OVER (ORDER BY acceso DESC, clave) AS acumulado FROM cache)"
+                " WHERE acumulado > ?)",
+                (self.max_bytes,),
+            )
+
+    def items(self) -> list:
+        with self._conectar() as con:
+            filas = con.execute("SELECT clave, valor FROM cache").fetchall()
+        return [(clave, json.loads(valor)) for clave, valor in filas]
+
+    def __len__(self):
+        with self._conectar() as con:
+            return con.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
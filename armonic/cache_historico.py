@@ -0,0 +1,113 @@
+# armonic/cache_historico.py
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+CACHE_DIR = os.path.join("data", "cache")
+
+# fecha,item_nombre,codunicopedido,codigo_producto,cantidad,day
+COLUMNAS_CSV = {
+    "fecha": "date",
+    "item_nombre": "name",
+    "codunicopedido": "id_order",
+    "codigo_producto": "id",
+    "cantidad": "cantidad",
+}
+FILAS_POR_GRUPO = 250_000  # row groups chicos => el filtro por fecha salta más datos
+
+# esquema compacto: nombres como diccionario (category en pandas), ids de 32 bits y fecha al segundo
+ESQUEMA = pa.schema([
+    ("date", pa.timestamp("s")),
+    ("name", pa.dictionary(pa.int32(), pa.string())),
+    ("id_order", pa.int32()),
+    ("id", pa.int32()),
+    ("cantidad", pa.float64()),
+])
+VERSION_ESQUEMA = 2  # forma parte del nombre del cache: un cambio de esquema no reutiliza archivos viejos
+
+
+def hash_contenido(file_bytes: bytes) -> str:
+    return hashlib.sha1(file_bytes).hexdigest()
+
+
+def ruta_cache(file_hash: str, cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"historico_v{VERSION_ESQUEMA}_{file_hash}.parquet")
+
+
+def _tabla_desde_csv(file_bytes: bytes) -> pa.Table:
+    # lectura multihilo con arrow, solo las columnas útiles y la fecha parseada en el mismo paso;
+    # la columna `day` del archivo se descarta: se deriva de `date` cuando hace falta
+    table = pv.read_csv(
+        pa.py_buffer(file_bytes),
+        convert_options=pv.ConvertOptions(
+            include_columns=list(COLUMNAS_CSV),
+            column_types={
+                "fecha": pa.timestamp("s"),  # parser ISO8601 nativo de arrow
+                "item_nombre": pa.dictionary(pa.int32(), pa.string()),
+                "codunicopedido": pa.float64(),  # viene como "4017074.0": se castea abajo
+                "codigo_producto": pa.int32(),
+                "cantidad": pa.float64(),
+            },
+        ),
+    )
+    table = table.rename_columns([COLUMNAS_CSV[c] for c in table.column_names])
+    # cast seguro: falla si algún código no es entero o no entra en 32 bits
+    return table.select(ESQUEMA.names).cast(ESQUEMA)
+
+
+def leer_csv_ventas(file_bytes: bytes) -> pd.DataFrame:
+    """CSV de ventas (mismo formato que el histórico) como DataFrame con columnas renombradas."""
+    return _tabla_desde_csv(file_bytes).to_pandas()
+
+
+def convertir_historico(file_bytes: bytes, cache_dir: str = CACHE_DIR) -> str:
+    """Convierte el CSV de ventas a Parquet (una sola vez por contenido) y devuelve la ruta."""
+    path = ruta_cache(hash_contenido(file_bytes), cache_dir)
+    if os.path.exists(path):
+        return path
+
+    table = _tabla_desde_csv(file_bytes)
+    # ordenado por fecha para que cada row group cubra un rango de fechas contiguo
+    # (los exports del POS ya vienen casi siempre en orden: en ese caso no se reordena)
+    fechas = table["date"]
+    if len(fechas) > 1 and not pc.all(pc.greater_equal(fechas[1:], fechas[:-1])).as_py():
+        table = table.sort_by("date")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, row_group_size=FILAS_POR_GRUPO)
+    os.replace(tmp_path, path)  # escritura atómica: otra sesión nunca ve un archivo a medias
+    return path
+
+
+def rango_fechas(path: str) -> tuple:
+    """(fecha mínima, fecha máxima) leídas de las estadísticas del Parquet, sin leer datos."""
+    meta = pq.ParquetFile(path).metadata
+    col = meta.schema.names.index("date")
+    mins, maxs = [], []
+    for i in range(meta.num_row_groups):
+        stats = meta.row_group(i).column(col).statistics
+        if stats is not None and stats.has_min_max:
+            mins.append(pd.Timestamp(stats.min))
+            maxs.append(pd.Timestamp(stats.max))
+    if not mins:
+        return None, None
+    return min(mins), max(maxs)
+
+
+def leer_historico(path: str, columnas=None, desde=None, hasta=None) -> pd.DataFrame:
+    """Lee solo `columnas` y las filas con `desde <= date < hasta` (filtro empujado al Parquet)."""
+    filtros = []
+    if desde is not None:
+        filtros.append(("date", ">=", pd.Timestamp(desde)))
+    if hasta is not None:
+        filtros.append(("date", "<", pd.Timestamp(hasta)))
+    df = pd.read_parquet(path, columns=columnas, filters=filtros or None)
+    if "date" in df.columns:
+        df["date"] = df["date"].astype("datetime64[s]")  # Parquet guarda a ms como mínimo
+    return df
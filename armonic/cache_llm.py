@@ -0,0 +1,66 @@
+# armonic/cache_llm.py
+import hashlib
+import json
+import os
+from types import SimpleNamespace
+
+from armonic.cache_disco import CacheDisco
+
+CACHE_INSIGHTS_PATH = os.path.join("data", "cache", "insights.sqlite")
+TTL_INSIGHTS = 24 * 3600  # los prompts ya llevan la fecha del día; esto limpia lo viejo
+CACHE_OCR_PATH = os.path.join("data", "cache", "ocr.sqlite")
+MAX_BYTES_OCR = 200 * 1024 * 1024
+
+
+def cache_insights(path: str = CACHE_INSIGHTS_PATH) -> CacheDisco:
+    return CacheDisco(path, ttl_segundos=TTL_INSIGHTS, max_entradas=2000)
+
+
+def cache_ocr(path: str = CACHE_OCR_PATH) -> CacheDisco:
+    # una factura no cambia: sin TTL, se desaloja por tamaño total (LRU)
+    return CacheDisco(path, ttl_segundos=None, max_entradas=100_000, max_bytes=MAX_BYTES_OCR)
+
+
+def clave_llm(model: str, messages: list, **params) -> str:
+    """Hash del modelo, los mensajes (prompt + tabla) y los parámetros de la llamada."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chat_cacheado(client, cache: CacheDisco, model: str, messages: list, **params) -> str:
+    """`client.chat.completions.create` con cache: la misma tabla no vuelve a llamar al modelo."""
+    clave = clave_llm(model, messages, **params)
+    texto = cache.get(clave)
+    if texto is not None:
+        return texto
+    resp = client.chat.completions.create(model=model, messages=messages, **params)
+    texto = (resp.choices[0].message.content or "").strip()
+    cache.set(clave, texto)
+    return texto
+
+
+class ClienteLocal:
+    """Reemplazo offline del cliente de OpenAI (misma forma de `chat.completions.create`).
+
+    Responde un texto determinístico a partir del prompt y cuenta las llamadas;
+    se activa con LLM_LOCAL=1 para probar las páginas sin red ni API_KEY.
+    """
+
+    def __init__(self):
+        self.llamadas = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **params):
+        self.llamadas += 1
+        ultimo = messages[-1]["content"]
+        if isinstance(ultimo, list):  # mensajes multimodales (texto + imagen)
+            ultimo = " ".join(p.get("text", "") for p in ultimo if isinstance(p, dict))
+        huella = hashlib.sha1(ultimo.encode("utf-8")).hexdigest()[:8]
+        contenido = f"- Insight local ({model}, prompt {huella}, {len(ultimo)} caracteres)."
+        if params.get("stream"):
+            # mismos chunks que el SDK con stream=True (choices[0].delta.content)
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=contenido), finish_reason="stop")])])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=contenido))])
@@ -0,0 +1,146 @@
+# armonic/catalogo.py
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from armonic.cache_disco import CacheDisco, firma_archivo
+from armonic.recetas import RECETAS_PATH
+
+MAPEOS_PATH = os.path.join("data", "cache", "mapeos_insumos.sqlite")
+UMBRAL_COINCIDENCIA = 0.4  # Dice de trigramas mínimo para proponer un insumo
+
+
+def normalizar(texto) -> str:
+    # mayúsculas sin tildes, solo letras y números separados por un espacio
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^A-Z0-9]+", " ", texto.upper()).split())
+
+
+def trigramas(texto: str) -> set:
+    # trigramas por palabra con relleno ("  POLLO " -> "  P", " PO", "POL", ...): tolera letras faltantes o cambiadas
+    grams = set()
+    for palabra in normalizar(texto).split():
+        p = f"  {palabra} "
+        grams.update(p[i:i + 3] for i in range(len(p) - 2))
+    return grams
+
+
+class IndiceTrigramas:
+    """Índice invertido trigrama -> entradas, para buscar los nombres más parecidos sin comparar contra todo el catálogo.
+
+    El puntaje es el coeficiente de Dice entre conjuntos de trigramas; solo se tocan las entradas que
+    comparten al menos un trigrama con la consulta. Un nombre (normalizado) tiene una sola entrada:
+    agregarlo otra vez reemplaza su valor. Es seguro usarlo desde varias sesiones a la vez.
+    """
+
+    def __init__(self):
+        self.nombres = []
+        self.valores = []
+        self._tamanios = []
+        self._postings = defaultdict(list)
+        self._posicion = {}  # nombre normalizado -> entrada
+        self._lock = threading.Lock()
+
+    def agregar(self, nombre: str, valor):
+        grams = trigramas(nombre)
+        if not grams:
+            return
+        with self._lock:
+            i = self._posicion.get(normalizar(nombre))
+            if i is not None:
+                # mismos trigramas: basta con cambiar el valor
+                self.nombres[i], self.valores[i] = nombre, valor
+                return
+            i = len(self.nombres)
+            self._posicion[normalizar(nombre)] = i
+            self.nombres.append(nombre)
+            self.valores.append(valor)
+            self._tamanios.append(len(grams))
+            for g in grams:
+                self._postings[g].append(i)
+
+    def buscar(self, texto: str, k: int = 3) -> list:
+        """[(valor, nombre, puntaje)] de las k entradas más parecidas, de mayor a menor."""
+        grams = trigramas(texto)
+        with self._lock:
+            listas = [self._postings[g] for g in grams if g in self._postings]
+            if not listas:
+                return []
+            comunes = np.bincount(np.concatenate(listas), minlength=len(self.nombres))
+            candidatos = np.flatnonzero(comunes)
+            puntajes = 2.0 * comunes[candidatos] / (len(grams) + np.asarray(self._tamanios)[candidatos])
+            orden = candidatos[np.argsort(-puntajes, kind="stable")[:k]]
+            puntaje_de = dict(zip(candidatos, puntajes))
+            return [(self.valores[i], self.nombres[i], float(puntaje_de[i])) for i in orden]
+
+
+class CatalogoInsumos:
+    """Resuelve descripciones de factura a `id_insumo` de las recetas.
+
+    Las recetas solo traen el id del insumo, así que el catálogo usa como alias el nombre de cada
+    producto para su insumo principal (mayor costo en la receta), más las descripciones ya
+    confirmadas por el usuario, que se guardan en disco y se comparten entre sesiones. El alias por
+    producto es una aproximación débil ("POLLO A LA BRASA" propone el pollo, pero un producto cuyo
+    insumo más caro es el aceite lo propone para cualquier línea parecida al plato): la ayuda de la
+    columna ID_INSUMO lo advierte y las propuestas mejoran a medida que se confirman mapeos.
+    """
+
+    def __init__(self, recetas: pd.DataFrame, mapeos: CacheDisco):
+        self.mapeos = mapeos
+        self.indice = IndiceTrigramas()
+        recetas = recetas.dropna(subset=["id_insumo"]).assign(
+            id_insumo=lambda d: d["id_insumo"].astype(np.int64),
+            costo=lambda d: d["cantidad"] * d["costo_unitario"],
+        )
+        principal = recetas.loc[recetas.groupby("name")["costo"].idxmax()]
+        for nombre, id_insumo in zip(principal["name"], principal["id_insumo"]):
+            self.indice.agregar(nombre, int(id_insumo))
+        for descripcion, id_insumo in mapeos.items():
+            self.indice.agregar(descripcion, int(id_insumo))
+
+    def resolver(self, descripcion: str):
+        """(id_insumo, puntaje) del mejor candidato; confirmado = 1.0, sin candidato = (None, 0.0)."""
+        confirmado = self.mapeos.get(normalizar(descripcion))
+        if confirmado is not None:
+            return int(confirmado), 1.0
+        candidatos = self.indice.buscar(descripcion, k=1)
+        if not candidatos or candidatos[0][2] < UMBRAL_COINCIDENCIA:
+            return None, candidatos[0][2] if candidatos else 0.0
+        return candidatos[0][0], candidatos[0][2]
+
+    def resolver_lote(self, descripciones) -> pd.DataFrame:
+        filas = [self.resolver(d) for d in descripciones]
+        return pd.DataFrame(filas, columns=["id_insumo", "puntaje"]).astype({"id_insumo": "Int64"})
+
+    def confirmar(self, descripcion: str, id_insumo: int):
+        # reemplaza el mapeo anterior de la misma descripción (o el alias de producto con ese nombre)
+        clave = normalizar(descripcion)
+        if not clave or self.mapeos.get(clave) == int(id_insumo):
+            return
+        self.mapeos.set(clave, int(id_insumo))
+        self.indice.agregar(clave, int(id_insumo))
+
+
+def mapeos_confirmados(path: str = MAPEOS_PATH) -> CacheDisco:
+    # sin TTL: un mapeo confirmado vale hasta que el usuario lo cambie
+    return CacheDisco(path, ttl_segundos=None, max_entradas=50_000)
+
+
+_CATALOGOS = {}  # ruta -> (firma, catálogo): solo la última versión de cada archivo
+
+
+def cargar_catalogo(path: str = RECETAS_PATH):
+    """Catálogo compartido por sesiones (el índice se arma una vez por versión de recetas, según
+    fecha de modificación y tamaño, sin leer el archivo en cada rerun). None si no hay recetas."""
+    if not os.path.exists(path):
+        return None
+    firma = firma_archivo(path)
+    guardado = _CATALOGOS.get(firma[0])
+    if guardado is None or guardado[0] != firma:
+        _CATALOGOS[firma[0]] = (firma, CatalogoInsumos(pd.read_csv(path), mapeos_confirmados()))
+    return _CATALOGOS[firma[0]][1]
@@ -0,0 +1,113 @@
+# armonic/compra.py
+import numpy as np
+import pandas as pd
+
+from armonic.normalizacion import a_numero
+
+COLUMNAS_EDITABLES = [
+    "PRODUCTO",
+    "ID_INSUMO",
+    "Q_ESTIMACION",
+    "PROVEEDOR",
+    "PRECIO_HISTORICO",
+    "UNIDAD",
+    "ENTRADAS: CANTIDAD INSUMOS",
+    "PRECIO_MERCADO",
+    "AJUSTE_MERMAS",
+    "INCLUIR",
+]
+COLUMNAS_DERIVADAS = ["MONTO_ESTIMADO", "PRESUPUESTO", "MONTO_REAL", "DIF"]
+COLUMNAS_NUMERICAS = ["Q_ESTIMACION", "PRECIO_HISTORICO", "ENTRADAS: CANTIDAD INSUMOS", "PRECIO_MERCADO", "AJUSTE_MERMAS"]
+# valores de una fila agregada desde el editor (lo que el usuario no completó)
+POR_DEFECTO = {"PRODUCTO": "", "ID_INSUMO": pd.NA, "PROVEEDOR": "LOS CABALLOS", "UNIDAD": "KG", "AJUSTE_MERMAS": 0.05, "INCLUIR": True}
+
+
+class TablaCompra:
+    """Tabla Gestionar Compra con id estable por fila y columnas derivadas materializadas.
+
+    Es el único frame de la compra: Facturación y Proveedores editan vistas (subconjuntos de
+    columnas/filas) y aplican el change set de su st.data_editor por id de fila, así que solo se
+    recalculan las derivadas de las filas tocadas en vez de reconstruir la tabla en cada edición.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame.copy()
+        for col in COLUMNAS_EDITABLES:
+            if col not in frame.columns:
+                frame[col] = POR_DEFECTO.get(col, 0.0)
+        frame["ID_INSUMO"] = frame["ID_INSUMO"].astype("Int64")
+        for col in COLUMNAS_NUMERICAS:
+            frame[col] = a_numero(frame[col])
+        frame["INCLUIR"] = frame["INCLUIR"].astype(bool)
+        frame.index = pd.RangeIndex(len(frame), name="id_fila")
+        self.frame = frame[COLUMNAS_EDITABLES].copy()
+        for col in COLUMNAS_DERIVADAS:
+            self.frame[col] = np.nan
+        self._siguiente_id = len(frame)
+        self.vistas = {}  # clave del editor -> ids de fila en el orden en que se mostraron
+        self.recalcular(self.frame.index)
+
+    def recalcular(self, ids):
+        # MONTO_ESTIMADO = Q x precio histórico; PRESUPUESTO agrega mermas; MONTO_REAL = entradas x precio de mercado
+        pos = self.frame.index.get_indexer(ids)
+        col = lambda nombre: self.frame[nombre].to_numpy()[pos]
+        monto_estimado = col("Q_ESTIMACION") * col("PRECIO_HISTORICO")
+        presupuesto = monto_estimado * (1 + col("AJUSTE_MERMAS"))
+        monto_real = col("ENTRADAS: CANTIDAD INSUMOS") * col("PRECIO_MERCADO")
+        # columna por columna: escribir un bloque de filas sueltas en un frame de tipos mixtos es mucho más lento
+        for nombre, valores in zip(COLUMNAS_DERIVADAS, [monto_estimado, presupuesto, monto_real, presupuesto - monto_real]):
+            self.frame.iloc[pos, self.frame.columns.get_loc(nombre)] = valores
+
+    def vista(self, clave: str, columnas: list, filas=None) -> pd.DataFrame:
+        """Filas (máscara booleana o todas) y columnas para el editor `clave`; recuerda qué id tiene cada posición."""
+        vista = self.frame.loc[filas if filas is not None else slice(None), columnas]
+        self.vistas[clave] = vista.index.to_numpy()
+        return vista.reset_index(drop=True)
+
+    def aplicar_cambios(self, clave: str, estado: dict) -> dict:
+        """Aplica el change set de un st.data_editor (`edited_rows`, `added_rows`, `deleted_rows`,
+        con posiciones de la última vista de `clave`). Devuelve {id_fila: columnas cambiadas}."""
+        ids_vista = self.vistas.get(clave)
+        if not estado or ids_vista is None:
+            return {}
+        cambios = {}
+        for pos, valores in estado.get("edited_rows", {}).items():
+            id_fila = int(ids_vista[int(pos)])
+            columnas = {col for col, valor in valores.items() if col in COLUMNAS_EDITABLES and self._asignar(id_fila, col, valor)}
+            if columnas:
+                cambios[id_fila] = columnas
+        for valores in estado.get("added_rows", []):
+            fila = {col: POR_DEFECTO.get(col, 0.0) for col in COLUMNAS_EDITABLES}
+            fila.update({col: valor for col, valor in valores.items() if col in COLUMNAS_EDITABLES and valor is not None})
+            id_fila = self._siguiente_id
+            self._siguiente_id += 1
+            nueva = pd.DataFrame([fila], index=pd.Index([id_fila], name="id_fila"))
+            self.frame = pd.concat([self.frame, nueva.astype(self.frame.dtypes[COLUMNAS_EDITABLES])])
+            cambios[id_fila] = set(valores)
+        borrados = [int(ids_vista[int(pos)]) for pos in estado.get("deleted_rows", [])]
+        if borrados:
+            self.frame = self.frame.drop(index=borrados)
+            cambios.update({id_fila: {"_borrada"} for id_fila in borrados})
+        vivos = [id_fila for id_fila in cambios if id_fila in self.frame.index]
+        if vivos:
+            self.recalcular(vivos)
+        # el mismo change set puede volver a llegar si la vista no cambió: ya está aplicado
+        self.vistas[clave] = None
+        return cambios
+
+    def _asignar(self, id_fila, col: str, valor) -> bool:
+        if col in COLUMNAS_NUMERICAS:
+            valor = np.nan if valor is None else float(valor)
+        actual = self.frame.at[id_fila, col]
+        if pd.isna(actual) or pd.isna(valor):
+            if pd.isna(actual) and pd.isna(valor):
+                return False
+        elif actual == valor:
+            return False
+        self.frame.at[id_fila, col] = pd.NA if col == "ID_INSUMO" and valor is None else valor
+        return True
+
+    def asignar(self, ids, columna: str, valores):
+        """Cambia una columna en las filas `ids` (p. ej. Q_ESTIMACION al asignar insumo) y recalcula solo esas."""
+        self.frame.loc[ids, columna] = valores
+        self.recalcular(ids)
@@ -0,0 +1,53 @@
+# armonic/demanda_diaria.py
+import numpy as np
+import pandas as pd
+
+
+class MatrizDemanda:
+    """Demanda esperada producto x día (float32), para cortes por rango de días y por producto.
+
+    Los recortes (`rango`, `productos`) devuelven vistas sobre el mismo arreglo cuando es posible:
+    la matriz se calcula una vez por pronóstico y no se reconstruye por cada vista.
+    """
+
+    def __init__(self, ids, nombres, fechas, valores):
+        self.ids = np.asarray(ids)
+        self.nombres = np.asarray(nombres, dtype=object)
+        self.fechas = pd.DatetimeIndex(fechas)
+        self.valores = valores  # (productos, días)
+
+    @classmethod
+    def desde_pronostico(cls, proporciones: pd.DataFrame, predict: dict, avg_items_per_order: float) -> "MatrizDemanda":
+        # participación de cada producto (E = p * q normalizado) x unidades esperadas por día:
+        # un solo producto externo, sin loops por producto ni por día
+        E = (proporciones["p"] * proporciones["q"]).to_numpy(dtype=np.float64)
+        participacion = E / E.sum() if E.sum() > 0 else np.full(len(E), 1.0 / max(len(E), 1))
+        unidades_dia = np.asarray(predict["prediccion"], dtype=np.float64) * avg_items_per_order
+        valores = np.multiply.outer(participacion, unidades_dia).astype(np.float32)
+        return cls(proporciones["id"], proporciones["name"], pd.to_datetime(predict["fechas"]), valores)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rango(self, desde=None, hasta=None) -> "MatrizDemanda":
+        """Días en [desde, hasta] (inclusive). Vista, sin copiar."""
+        i = 0 if desde is None else self.fechas.searchsorted(pd.Timestamp(desde), side="left")
+        j = len(self.fechas) if hasta is None else self.fechas.searchsorted(pd.Timestamp(hasta), side="right")
+        return MatrizDemanda(self.ids, self.nombres, self.fechas[i:j], self.valores[:, i:j])
+
+    def primeros_dias(self, dias: int) -> "MatrizDemanda":
+        return MatrizDemanda(self.ids, self.nombres, self.fechas[:dias], self.valores[:, :dias])
+
+    def productos(self, ids) -> "MatrizDemanda":
+        filas = pd.Index(self.ids).get_indexer(np.asarray(ids))
+        filas = filas[filas >= 0]
+        return MatrizDemanda(self.ids[filas], self.nombres[filas], self.fechas, self.valores[filas])
+
+    def totales(self) -> np.ndarray:
+        return self.valores.sum(axis=1, dtype=np.float64)
+
+    def a_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.valores, columns=self.fechas.strftime("%d/%m"))
+        df.insert(0, "Nombre", self.nombres)
+        df.insert(0, "id", self.ids)
+        return df
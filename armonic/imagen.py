@@ -0,0 +1,122 @@
+# armonic/imagen.py
+import os
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# el modelo de visión reescala toda imagen "high" a <= 2048 px de lado largo y 768 px de lado corto:
+# enviar más resolución solo agrega bytes y latencia, no detalle
+LADO_LARGO_MAX = 2048
+LADO_CORTO_MAX = 768
+TILE = 512  # en "high" se cobra por tile de 512 x 512
+RECORTE_TILE_MAX = 0.15  # se reduce hasta 15% más si con eso la imagen ocupa una fila/columna de tiles menos
+LADO_LOW = 512  # con detail="low" el modelo ve la imagen a 512 x 512
+ALTO_LINEA_LOW = 12  # px mínimos por línea de texto en la vista low para que siga siendo legible
+CALIDAD_JPEG = 80
+VERSION_PREPROCESO = 3  # entra en la clave del cache de OCR: cambiarla invalida resultados viejos
+# ahorros que ven menos que el modelo (detail="low" y el recorte extra a múltiplos de tile) quedan
+# apagados hasta validar con `bench_imagen --ocr` que la extracción no cambia
+AHORRO_EXTRA = os.getenv("OCR_AHORRO_EXTRA") == "1"
+
+
+def _escala_api(ancho: int, alto: int) -> float:
+    # misma reducción que aplica el modelo: entrar en 2048 x 2048 y dejar el lado corto en <= 768
+    return min(1.0, LADO_LARGO_MAX / max(ancho, alto), LADO_CORTO_MAX / min(ancho, alto))
+
+
+def _ajuste_tiles(ancho: float, alto: float) -> float:
+    # al recortar al papel la imagen suele pasar apenas de un múltiplo de 512 y paga una fila de tiles
+    # casi vacía: si bajar a ese múltiplo cuesta <= RECORTE_TILE_MAX de resolución, se baja
+    factor = 1.0
+    for lado in (ancho, alto):
+        if lado > TILE:
+            limite = np.floor(lado / TILE) * TILE / lado
+            if limite < 1.0 and 1.0 - limite <= RECORTE_TILE_MAX:
+                factor = min(factor, limite)
+    return factor
+
+
+def tokens_imagen(ancho: int, alto: int, detail: str) -> int:
+    """Tokens de entrada que cobra el modelo por la imagen (85 base + 170 por tile de 512 en "high")."""
+    if detail == "low":
+        return 85
+    escala = _escala_api(ancho, alto)
+    w, h = ancho * escala, alto * escala
+    return 85 + 170 * int(np.ceil(w / 512) * np.ceil(h / 512))
+
+
+def _umbral_otsu(gris: np.ndarray) -> int:
+    hist = np.bincount(gris.ravel(), minlength=256).astype(np.float64)
+    p = hist / hist.sum()
+    omega = np.cumsum(p)
+    mu = np.cumsum(p * np.arange(256))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = (mu[-1] * omega - mu) ** 2 / (omega * (1 - omega))
+    if np.isnan(sigma).all():
+        return int(gris.min())  # un solo tono (foto en blanco): no hay papel que separar
+    return int(np.nanargmax(sigma))
+
+
+def recortar_documento(gris: np.ndarray) -> tuple:
+    """(fila0, fila1, col0, col1) del papel: filas/columnas con mayoría de píxeles claros.
+
+    Si el recorte dejaría menos del 30% de la foto (papel oscuro, foto ya recortada), no se recorta.
+    """
+    claro = gris > _umbral_otsu(gris)
+    filas = np.flatnonzero(claro.mean(axis=1) > 0.5)
+    cols = np.flatnonzero(claro.mean(axis=0) > 0.5)
+    alto, ancho = gris.shape
+    if len(filas) == 0 or len(cols) == 0:
+        return 0, alto, 0, ancho
+    f0, f1, c0, c1 = filas[0], filas[-1] + 1, cols[0], cols[-1] + 1
+    if (f1 - f0) * (c1 - c0) < 0.3 * alto * ancho:
+        return 0, alto, 0, ancho
+    return f0, f1, c0, c1
+
+
+def lineas_texto(gris: np.ndarray) -> tuple:
+    """(cantidad de líneas de texto, alto mediano en px) por perfil de proyección horizontal de tinta."""
+    tinta = gris < _umbral_otsu(gris)
+    con_tinta = tinta.mean(axis=1) > 0.01
+    cambios = np.diff(np.concatenate([[0], con_tinta.astype(np.int8), [0]]))
+    inicios, fines = np.flatnonzero(cambios == 1), np.flatnonzero(cambios == -1)
+    altos = fines - inicios
+    altos = altos[altos >= 3]  # ruido de 1-2 px
+    if len(altos) == 0:
+        return 0, 0.0
+    return len(altos), float(np.median(altos))
+
+
+def elegir_detail(gris: np.ndarray) -> str:
+    # "low" solo si el texto sigue legible a 512 px; facturas con muchas líneas o letra chica van en "high"
+    n_lineas, alto_linea = lineas_texto(gris)
+    escala_low = LADO_LOW / max(gris.shape)
+    return "low" if n_lineas > 0 and alto_linea * escala_low >= ALTO_LINEA_LOW else "high"
+
+
+def preparar_imagen(file_bytes: bytes, ahorro_extra: bool = AHORRO_EXTRA) -> tuple:
+    """Imagen lista para el OCR: (bytes, mime, detail).
+
+    Orienta según EXIF, pasa a escala de grises, recorta al documento, reduce a la resolución que el
+    modelo realmente usa y recomprime en JPEG. Si el resultado no es más liviano se envía el original.
+    Por defecto la reducción es exactamente la del modelo y `detail` es "high"; con `ahorro_extra`
+    (OCR_AHORRO_EXTRA=1) se recorta hasta un 15% más para ahorrar una fila de tiles y se elige "low"
+    cuando el texto sigue legible.
+    """
+    imagen = ImageOps.exif_transpose(Image.open(BytesIO(file_bytes))).convert("L")
+    gris = np.asarray(imagen)
+    f0, f1, c0, c1 = recortar_documento(gris)
+    imagen = imagen.crop((c0, f0, c1, f1))
+    escala = _escala_api(*imagen.size)
+    if ahorro_extra:
+        escala *= _ajuste_tiles(imagen.width * escala, imagen.height * escala)
+    if escala < 1.0:
+        imagen = imagen.resize((max(1, round(imagen.width * escala)), max(1, round(imagen.height * escala))), Image.LANCZOS)
+    detail = elegir_detail(np.asarray(imagen)) if ahorro_extra else "high"
+    salida = BytesIO()
+    imagen.save(salida, format="JPEG", quality=CALIDAD_JPEG, optimize=True)
+    if salida.tell() >= len(file_bytes):
+        formato = Image.open(BytesIO(file_bytes)).format or "JPEG"
+        return file_bytes, f"image/{formato.lower()}", detail
+    return salida.getvalue(), "image/jpeg", detail
@@ -0,0 +1,117 @@
+# armonic/ingesta.py
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from armonic.proporciones import PROPORCIONES_COLS
+
+
+class HistoricoIncremental:
+    """Agregados del histórico de ventas que se actualizan solo con las filas nuevas.
+
+    Mantiene las órdenes diarias (suma de `cantidad` por día, como `ventas_diarias_completa.csv`)
+    y, por producto, los días con venta y la cantidad total. Cada `agregar` cuesta O(filas nuevas):
+    nunca se vuelve a recorrer el histórico.
+    """
+
+    def __init__(self):
+        self.ultima_fecha = None  # marca de agua: solo se agregan filas posteriores
+        self.ordenes_diarias = {}  # día -> suma de cantidad
+        self._indice = {}  # nombre -> posición en los arreglos por producto
+        self.nombres = []
+        self.ids = np.empty(0, dtype=np.int64)
+        self.dias_con_venta = np.empty(0, dtype=np.int64)
+        self.cantidad_total = np.empty(0, dtype=np.float64)
+        self.ultimo_dia = np.empty(0, dtype="datetime64[ns]")
+
+    @classmethod
+    def desde_historico(cls, df: pd.DataFrame) -> "HistoricoIncremental":
+        inc = cls()
+        inc.agregar(df)
+        return inc
+
+    @property
+    def total_dias(self) -> int:
+        return len(self.ordenes_diarias)
+
+    def agregar(self, df: pd.DataFrame) -> int:
+        """Agrega las filas de `df` (date, name, id, cantidad) posteriores a la marca de agua.
+
+        Pensado para los cortes diarios del POS (días cerrados): una fila con la misma fecha/hora
+        que la última ya ingerida se considera repetida. Devuelve cuántas filas se agregaron.
+        """
+        if self.ultima_fecha is not None:
+            df = df[df["date"] > self.ultima_fecha]
+        df = df.dropna(subset=["name"])
+        if df.empty:
+            return 0
+
+        dias = df["date"].dt.floor("D").to_numpy(dtype="datetime64[ns]")
+        cantidad = df["cantidad"].to_numpy(dtype=np.float64)
+
+        # 1) órdenes diarias: solo se tocan los días presentes en el lote
+        dias_lote, dia_codes = np.unique(dias, return_inverse=True)
+        suma_dia = np.bincount(dia_codes, weights=cantidad, minlength=len(dias_lote))
+        for dia, total in zip(pd.DatetimeIndex(dias_lote), suma_dia):
+            self.ordenes_diarias[dia] = self.ordenes_diarias.get(dia, 0.0) + total
+
+        # 2) productos nuevos: se agregan al final de los arreglos
+        name_codes, nombres_lote = pd.factorize(df["name"])
+        pos_lote = np.fromiter((self._indice.get(n, -1) for n in nombres_lote), dtype=np.int64, count=len(nombres_lote))
+        nuevos = np.flatnonzero(pos_lote < 0)
+        if len(nuevos):
+            primera_fila = np.flatnonzero(np.diff(np.maximum.accumulate(name_codes), prepend=-1) > 0)
+            ids_lote = df["id"].to_numpy()[primera_fila]
+            pos_lote[nuevos] = len(self.nombres) + np.arange(len(nuevos))
+            for k in nuevos:
+                self._indice[nombres_lote[k]] = int(pos_lote[k])
+                self.nombres.append(nombres_lote[k])
+            self.ids = np.concatenate([self.ids, ids_lote[nuevos]])
+            self.dias_con_venta = np.concatenate([self.dias_con_venta, np.zeros(len(nuevos), dtype=np.int64)])
+            self.cantidad_total = np.concatenate([self.cantidad_total, np.zeros(len(nuevos))])
+            self.ultimo_dia = np.concatenate([self.ultimo_dia, np.full(len(nuevos), np.datetime64("NaT"), dtype="datetime64[ns]")])
+
+        # 3) contadores por producto; un (producto, día) ya contado solo puede ser el último día
+        #    ingerido de ese producto, porque el lote es posterior a la marca de agua
+        pos = pos_lote[name_codes]
+        np.add.at(self.cantidad_total, pos, cantidad)
+        pares = pd.DataFrame({"pos": pos, "dia": dias}).drop_duplicates()
+        pares = pares[pares["dia"].to_numpy() != self.ultimo_dia[pares["pos"].to_numpy()]]
+        np.add.at(self.dias_con_venta, pares["pos"].to_numpy(), 1)
+        ultimo = pares.groupby("pos")["dia"].max()
+        self.ultimo_dia[ultimo.index.to_numpy()] = ultimo.to_numpy(dtype="datetime64[ns]")
+
+        self.ultima_fecha = df["date"].max()
+        return len(df)
+
+    def proporciones(self) -> pd.DataFrame:
+        """Mismo frame que `calcular_proporciones` sobre todo lo ingerido."""
+        if not self.nombres:
+            return pd.DataFrame(columns=PROPORCIONES_COLS)
+        orden = np.argsort(np.asarray(self.nombres, dtype=object), kind="stable")
+        return pd.DataFrame({
+            "id": self.ids[orden],
+            "name": np.asarray(self.nombres, dtype=object)[orden],
+            "p": self.dias_con_venta[orden] / self.total_dias,
+            "q": self.cantidad_total[orden] / self.dias_con_venta[orden],
+        })
+
+    def historico_ordenes(self) -> pd.DataFrame:
+        serie = pd.Series(self.ordenes_diarias, dtype=np.float64).sort_index()
+        return pd.DataFrame({"fecha": serie.index, "ordenes diarias": serie.to_numpy()})
+
+    def guardar(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def cargar(path: str):
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
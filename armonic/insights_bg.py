@@ -0,0 +1,39 @@
+# armonic/insights_bg.py
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# un solo pool por proceso, compartido por todas las sesiones
+_EJECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="insights")
+ESPERA_INICIAL = 0.05  # segundos: si la respuesta sale del cache, se muestra sin placeholder
+
+
+def clave_tarea(*partes) -> str:
+    return hashlib.sha1(json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _fallo(future) -> bool:
+    return future.done() and not future.cancelled() and future.exception() is not None
+
+
+def pedir_insight(estado, slot: str, clave: str, fn, *args, **kwargs):
+    """Lanza `fn(*args, **kwargs)` en segundo plano para `slot` y devuelve su Future.
+
+    `estado` es `st.session_state` (o cualquier dict). Si el slot ya tiene una tarea con la misma
+    clave se reutiliza; si esa tarea falló, se devuelve una vez (la página muestra el error) y la
+    siguiente llamada la vuelve a lanzar. Si la clave cambió (el usuario cambió filtros) la tarea
+    anterior se cancela solo si aún espera en la cola: una que ya está corriendo no se puede
+    interrumpir, sigue ocupando un hilo del pool hasta que el modelo responde (y esa llamada se
+    paga); su resultado simplemente se descarta.
+    `fn` corre fuera del script de Streamlit: no debe tocar `st.*`.
+    """
+    actual = estado.get(slot)
+    if actual is not None and actual["clave"] == clave and not actual["fallo_mostrado"]:
+        actual["fallo_mostrado"] = _fallo(actual["future"])
+        return actual["future"]
+    if actual is not None:
+        actual["future"].cancel()
+    future = _EJECUTOR.submit(fn, *args, **kwargs)
+    wait([future], timeout=ESPERA_INICIAL)
+    estado[slot] = {"clave": clave, "future": future, "fallo_mostrado": _fallo(future)}
+    return future
@@ -0,0 +1,53 @@
+# armonic/json_incremental.py
+import json
+
+
+class LectorObjetosJSON:
+    """Extrae objetos JSON completos de un texto que llega por partes (stream del modelo).
+
+    Sigue la profundidad de llaves fuera de strings y entrega cada objeto de primer nivel apenas
+    se cierra su llave, sin esperar el resto de la respuesta. Sirve igual para un array
+    (`[{...}, {...}]`), para JSON Lines o con texto/cercas de markdown alrededor. Los objetos mal
+    formados se cuentan en `descartados` y `pendiente` indica un objeto abierto sin cerrar: en
+    cualquiera de los dos casos la lista entregada está incompleta.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._profundidad = 0
+        self._en_string = False
+        self._escape = False
+        self.descartados = 0
+
+    @property
+    def pendiente(self) -> bool:
+        return self._profundidad > 0
+
+    def alimentar(self, texto: str) -> list:
+        """Objetos (dict) que quedaron completos con este fragmento."""
+        objetos = []
+        for c in texto:
+            if self._profundidad == 0:
+                if c != "{":
+                    continue  # "[", ",", saltos de línea o texto fuera de los objetos
+                self._buffer = []
+            self._buffer.append(c)
+            if self._en_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._en_string = False
+            elif c == '"':
+                self._en_string = True
+            elif c == "{":
+                self._profundidad += 1
+            elif c == "}":
+                self._profundidad -= 1
+                if self._profundidad == 0:
+                    try:
+                        objetos.append(json.loads("".join(self._buffer)))
+                    except json.JSONDecodeError:
+                        self.descartados += 1  # objeto mal formado: se sigue con el siguiente
+        return objetos
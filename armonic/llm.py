@@ -0,0 +1,152 @@
+# armonic/llm.py
+import os
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+from openai import APIConnectionError, APIStatusError, APITimeoutError, OpenAI
+
+from armonic.cache_llm import ClienteLocal
+
+MAX_CONCURRENCIA = 8  # llamadas simultáneas al modelo en todo el proceso
+TIMEOUT = 30.0  # segundos por llamada (el OCR pasa uno mayor)
+REINTENTOS = 4
+BACKOFF_BASE = 0.5  # 0.5, 1, 2, 4 s (+ jitter)
+BACKOFF_MAX = 20.0
+
+
+def _reintentable(error: Exception) -> bool:
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+def _espera(error: Exception, intento: int) -> float:
+    # respeta Retry-After si el servidor lo manda; si no, backoff exponencial con jitter
+    respuesta = getattr(error, "response", None)
+    retry_after = respuesta.headers.get("retry-after") if respuesta is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), BACKOFF_MAX)
+    except ValueError:
+        pass
+    return min(BACKOFF_BASE * 2 ** intento, BACKOFF_MAX) * (0.5 + random.random())
+
+
+class ClienteLLM:
+    """Cliente único por proceso para OCR e insights (misma interfaz `chat.completions.create`).
+
+    Envuelve un cliente tipo OpenAI con: pool de conexiones HTTP reutilizadas, límite global de
+    llamadas concurrentes, timeout por llamada, reintentos con backoff exponencial ante 429/5xx y
+    métricas de latencia por llamada.
+    """
+
+    def __init__(self, backend, max_concurrencia: int = MAX_CONCURRENCIA, timeout: float = TIMEOUT, reintentos: int = REINTENTOS):
+        self.backend = backend
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self._semaforo = threading.BoundedSemaphore(max_concurrencia)
+        self.metricas = deque(maxlen=1000)  # una entrada por llamada
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @classmethod
+    def openai(cls, api_key: str, max_concurrencia: int = MAX_CONCURRENCIA, **kwargs) -> "ClienteLLM":
+        http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=max_concurrencia, max_keepalive_connections=max_concurrencia),
+            timeout=kwargs.get("timeout", TIMEOUT),
+        )
+        # los reintentos los maneja ClienteLLM (fuera del semáforo), no el SDK
+        backend = OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+        return cls(backend, max_concurrencia=max_concurrencia, **kwargs)
+
+    def _create(self, *, timeout: float = None, **kwargs):
+        timeout = timeout or self.timeout
+        if kwargs.get("stream"):
+            return self._stream(timeout, kwargs)
+        t_inicio = time.perf_counter()
+        for intento in range(self.reintentos + 1):
+            with self._semaforo:
+                t0 = time.perf_counter()
+                try:
+                    resp = self.backend.chat.completions.create(timeout=timeout, **kwargs)
+                    self._registrar(kwargs.get("model"), time.perf_counter() - t0, time.perf_counter() - t_inicio, intento, True)
+                    return resp
+                except Exception as error:
+                    fallo = error
+            # la espera se hace fuera del semáforo: no ocupa un cupo mientras duerme
+            if intento == self.reintentos or not _reintentable(fallo):
+                self._registrar(kwargs.get("model"), time.perf_counter() - t0, time.perf_counter() - t_inicio, intento, False)
+                raise fallo
+            time.sleep(_espera(fallo, intento))
+
+    def _stream(self, timeout: float, kwargs: dict):
+        """Chunks de una llamada con stream=True. El cupo del semáforo se ocupa mientras dura el
+        stream; solo se reintenta la conexión (antes del primer chunk), no una respuesta a medias."""
+        t_inicio = time.perf_counter()
+        for intento in range(self.reintentos + 1):
+            with self._semaforo:
+                t0 = time.perf_counter()
+                try:
+                    resp = self.backend.chat.completions.create(timeout=timeout, **kwargs)
+                except Exception as error:
+                    fallo = error
+                else:
+                    primer_chunk, ok = None, False
+                    try:
+                        for chunk in resp:
+                            if primer_chunk is None:
+                                primer_chunk = time.perf_counter() - t_inicio
+                            yield chunk
+                        ok = True
+                    finally:
+                        self._registrar(kwargs.get("model"), time.perf_counter() - t0, time.perf_counter() - t_inicio,
+                                        intento, ok, primer_chunk)
+                    return
+            if intento == self.reintentos or not _reintentable(fallo):
+                self._registrar(kwargs.get("model"), time.perf_counter() - t0, time.perf_counter() - t_inicio, intento, False)
+                raise fallo
+            time.sleep(_espera(fallo, intento))
+
+    def _registrar(self, model, segundos, total, reintentos, ok, primer_chunk=None):
+        self.metricas.append({"model": model, "segundos": segundos, "total": total, "reintentos": reintentos, "ok": ok,
+                              "primer_chunk": primer_chunk})
+
+    def resumen_metricas(self) -> dict:
+        if not self.metricas:
+            return {"llamadas": 0}
+        total = np.array([m["total"] for m in self.metricas])
+        resumen = {
+            "llamadas": len(self.metricas),
+            "errores": sum(not m["ok"] for m in self.metricas),
+            "reintentos": sum(m["reintentos"] for m in self.metricas),
+            "p50_s": float(np.percentile(total, 50)),
+            "p95_s": float(np.percentile(total, 95)),
+        }
+        primeros = [m["primer_chunk"] for m in self.metricas if m["primer_chunk"] is not None]
+        if primeros:
+            # en llamadas con stream: cuánto tarda en llegar la primera parte de la respuesta
+            resumen["p50_primer_chunk_s"] = float(np.percentile(primeros, 50))
+        return resumen
+
+
+_cliente = None
+_lock = threading.Lock()
+
+
+def obtener_cliente():
+    """Cliente compartido por todo el proceso (se crea una sola vez); None si no hay API_KEY.
+
+    Con LLM_LOCAL=1 envuelve al ClienteLocal offline (mismos límites y métricas).
+    """
+    global _cliente
+    with _lock:
+        if _cliente is None:
+            if os.getenv("LLM_LOCAL"):
+                _cliente = ClienteLLM(ClienteLocal())
+            elif os.getenv("API_KEY"):
+                _cliente = ClienteLLM.openai(os.getenv("API_KEY"))
+        return _cliente
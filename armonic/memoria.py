@@ -0,0 +1,43 @@
+# armonic/memoria.py
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def tamanio_bytes(obj, vistos=None) -> int:
+    """Memoria aproximada de `obj`; cada objeto se cuenta una sola vez aunque esté compartido."""
+    if vistos is None:
+        vistos = set()
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        uso = obj.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(uso, pd.Series) else uso)
+    if isinstance(obj, np.ndarray):
+        # una vista no suma por sí misma: se cuenta (una vez) el arreglo del que sale
+        return int(obj.nbytes) if obj.base is None else tamanio_bytes(obj.base, vistos)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(tamanio_bytes(k, vistos) + tamanio_bytes(v, vistos) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(tamanio_bytes(v, vistos) for v in obj)
+    if hasattr(obj, "__dict__") and not isinstance(obj, type):
+        return sys.getsizeof(obj) + tamanio_bytes(vars(obj), vistos)
+    return sys.getsizeof(obj)
+
+
+def reporte_memoria(estado) -> pd.DataFrame:
+    """Memoria por clave de `st.session_state` (o cualquier mapping), de mayor a menor."""
+    vistos = set()
+    filas = []
+    for clave in list(estado.keys()):
+        valor = estado[clave]
+        filas.append({
+            "clave": str(clave),
+            "tipo": type(valor).__name__,
+            "KB": tamanio_bytes(valor, vistos) / 1024,
+        })
+    df = pd.DataFrame(filas, columns=["clave", "tipo", "KB"])
+    return df.sort_values("KB", ascending=False, ignore_index=True)
@@ -0,0 +1,81 @@
+# armonic/normalizacion.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+COLUMNAS_NUMERICAS_ITEMS = ["cantidad", "pu", "desc", "importe"]
+COLUMNAS_TEXTO_ITEMS = ["proveedor", "descripcion"]
+
+# moneda y todo lo que no sea dígito o separador, en una sola pasada (la alternativa "S/." va primero)
+_NO_NUMERICO = r"(?i)S/\.?|PEN|US\$|[^\d,.\-]"
+_MILES_COMA = r"-?[1-9]\d{0,2}(?:,\d{3})+"  # 1,234 / 12,345,678
+_MILES_PUNTO = r"-?[1-9]\d{0,2}(?:\.\d{3}){2,}"  # 1.234.567 (un solo grupo "1.234" se lee como decimal)
+_EXPONENTE = r"\d[eE][-+]?\d"  # "1e3" fuera de un decimal limpio ("S/ 1e3"): quitar la "e" lo volvería 13
+_DECIMAL = r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$"
+
+
+def _a_float(s):
+    # cast de Arrow solo sobre lo que ya es un decimal válido; el resto queda nulo
+    return pc.cast(pc.if_else(pc.match_substring_regex(s, _DECIMAL), s, pa.scalar(None, pa.string())), pa.float64())
+
+
+def _reglas(s):
+    # moneda, paréntesis, separadores de miles y coma decimal
+    negativo = pc.and_(pc.starts_with(s, "("), pc.ends_with(s, ")"))
+    exponente = pc.match_substring_regex(s, _EXPONENTE)
+    s = pc.replace_substring_regex(s, _NO_NUMERICO, "")
+    coma, punto = pc.match_substring(s, ","), pc.match_substring(s, ".")
+    invertido = pc.utf8_reverse(s)
+    coma_al_final = pc.less(pc.find_substring(invertido, ","), pc.find_substring(invertido, "."))
+    sin_comas = pc.replace_substring(s, ",", "")
+    decimal_coma = pc.replace_substring(pc.replace_substring(s, ".", ""), ",", ".")
+    # con coma y punto, el último separador es el decimal; con solo coma, miles o decimal; con solo punto, miles si hay varios grupos
+    con_coma = pc.if_else(
+        punto,
+        pc.if_else(coma_al_final, decimal_coma, sin_comas),
+        pc.if_else(pc.match_substring_regex(s, f"^{_MILES_COMA}$"), sin_comas, pc.replace_substring(s, ",", ".")),
+    )
+    sin_coma = pc.if_else(pc.match_substring_regex(s, f"^{_MILES_PUNTO}$"), pc.replace_substring(s, ".", ""), s)
+    s = pc.if_else(coma, con_coma, sin_coma)
+    valores = pc.if_else(exponente, pa.scalar(None, pa.float64()), _a_float(s))
+    return pc.if_else(negativo, pc.negate(pc.abs(valores)), valores)
+
+
+def a_numero(serie: pd.Series) -> pd.Series:
+    """Columna a float64 de una vez (kernels de Arrow, sin apply por celda); lo ilegible queda en 0.0.
+
+    Acepta montos como "S/ 1,234.50", "1.234,50", "3,20 kg", "(12.50)" (negativo) o "US$ 10".
+    Con coma y punto, el último es el separador decimal; con solo coma, es decimal salvo que
+    forme grupos de miles ("1,234"); con solo punto, es decimal salvo varios grupos ("1.234.567").
+    Un decimal con exponente ("1e3") se lee como tal; mezclado con moneda o separadores es ilegible.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(np.float64).fillna(0.0)
+    texto = pa.array(serie.astype("string[pyarrow]").array)  # celdas numéricas sueltas (OCR) pasan por str()
+    s = pc.utf8_trim_whitespace(texto)
+    valores = _a_float(s).to_numpy(zero_copy_only=False)
+    # las reglas de texto solo corren sobre las celdas que no eran ya un decimal ni vacías
+    pendientes = np.isnan(valores) & pc.greater(pc.utf8_length(s), 0).fill_null(False).to_numpy(zero_copy_only=False)
+    if pendientes.any():
+        valores[pendientes] = _reglas(pc.filter(s, pa.array(pendientes))).to_numpy(zero_copy_only=False)
+    return pd.Series(valores, index=serie.index, dtype=np.float64).fillna(0.0)
+
+
+def limpiar_texto(serie: pd.Series) -> pd.Series:
+    # mayúsculas y espacios colapsados; vacío para nulos
+    return serie.fillna("").astype("string[pyarrow]").str.upper().str.replace(r"\s+", " ", regex=True).str.strip().astype(object)
+
+
+def normalizar_items(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas numéricas y de texto del detalle de factura (OCR o XML) normalizadas en bloque."""
+    df = df.copy()
+    for col in COLUMNAS_NUMERICAS_ITEMS:
+        if col in df.columns:
+            df[col] = a_numero(df[col])
+    for col in COLUMNAS_TEXTO_ITEMS:
+        if col in df.columns:
+            df[col] = limpiar_texto(df[col])
+    if "um" in df.columns:
+        df["um"] = df["um"].fillna("").astype("string[pyarrow]").str.lower().astype(object)
+    return df
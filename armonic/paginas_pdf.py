@@ -0,0 +1,64 @@
+# armonic/paginas_pdf.py
+import re
+from io import BytesIO
+
+import pandas as pd
+from pypdf import PdfReader, PdfWriter
+
+# líneas de arrastre entre páginas ("VAN", "VIENEN", "TRANSPORTE", subtotales): no son ítems
+ARRASTRE = re.compile(r"^(VAN|VIENEN|TRANSPORTE|A LA VUELTA|SUB ?TOTAL|TOTAL)\b")
+CLAVE_FILA = ["descripcion", "cantidad", "pu", "importe"]  # sin proveedor: puede leerse distinto en cada hoja
+MAX_SOLAPE = 3  # filas que una hoja puede repetir de la anterior al cambiar de página
+
+
+def dividir_pdf(file_bytes: bytes) -> list:
+    """Un PDF de una página por cada página del original (el mismo archivo si tiene una sola)."""
+    lector = PdfReader(BytesIO(file_bytes))
+    if len(lector.pages) <= 1:
+        return [file_bytes]
+    paginas = []
+    for pagina in lector.pages:
+        escritor = PdfWriter()
+        escritor.add_page(pagina)
+        salida = BytesIO()
+        escritor.write(salida)
+        paginas.append(salida.getvalue())
+    return paginas
+
+
+def _solape(previa: pd.DataFrame, items: pd.DataFrame) -> int:
+    # k más grande tal que las primeras k filas de la hoja son las últimas k de la anterior, en orden
+    fin = [tuple(f) for f in previa[CLAVE_FILA].tail(MAX_SOLAPE).to_numpy().tolist()]
+    inicio = [tuple(f) for f in items[CLAVE_FILA].head(MAX_SOLAPE).to_numpy().tolist()]
+    for k in range(min(len(fin), len(inicio)), 0, -1):
+        if fin[-k:] == inicio[:k]:
+            return k
+    return 0
+
+
+def unir_paginas(paginas: list) -> pd.DataFrame:
+    """Une los ítems por página (en orden) en el detalle de una sola factura.
+
+    El encabezado del proveedor se repite en cada hoja y el OCR puede leerlo distinto o no verlo:
+    se usa el primero no vacío para toda la factura. Se descartan las líneas de arrastre y las
+    primeras filas de una hoja que repiten las últimas de la anterior (línea arrastrada al cambiar
+    de hoja); un mismo producto comprado dos veces en hojas distintas se conserva.
+    """
+    columnas = paginas[0].columns if paginas else []
+    partes = []
+    previa = None
+    for items in paginas:
+        items = items[~items["descripcion"].astype(str).str.match(ARRASTRE)]
+        leidas = items
+        if previa is not None and not items.empty:
+            items = items.iloc[_solape(previa, items):]
+        partes.append(items)
+        previa = leidas if not leidas.empty else previa
+    if not partes:
+        return pd.DataFrame(columns=columnas)
+    unidas = pd.concat(partes, ignore_index=True)
+    proveedores = unidas["proveedor"].astype(str).str.strip()
+    proveedores = proveedores[proveedores != ""]
+    if not proveedores.empty:
+        unidas["proveedor"] = proveedores.iloc[0]
+    return unidas
@@ -0,0 +1,264 @@
+# armonic/plantillas.py
+import hashlib
+import os
+import re
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from pypdf import PdfReader
+
+from armonic.cache_disco import CacheDisco
+from armonic.catalogo import normalizar
+from armonic.normalizacion import a_numero, normalizar_items
+from armonic.paginas_pdf import ARRASTRE
+
+PLANTILLAS_PATH = os.path.join("data", "cache", "plantillas_proveedor.sqlite")
+MIN_CONFIRMACIONES = 2  # facturas distintas confirmadas con el mismo formato antes de dejar de llamar al modelo de visión
+MAX_DOCUMENTOS = 50  # hashes de facturas confirmadas que se guardan por plantilla
+MIN_CARACTERES_TEXTO = 40  # menos que esto: PDF escaneado, sin capa de texto
+COLUMNAS = ["proveedor", "descripcion", "cantidad", "pu", "desc", "importe", "um"]
+CAMPOS_NUMERICOS = ["cantidad", "pu", "importe", "desc"]  # orden de asignación cuando dos valores coinciden
+
+_RUC = re.compile(r"\b(?:10|15|17|20)\d{9}\b")
+_NUMERO = re.compile(r"^\(?-?(?:S/\.?)?[\d.,]*\d\)?$")
+_NUMERO_CON_UNIDAD = re.compile(r"^(-?[\d.,]*\d)([A-Za-z]+)$")  # "3.20kg" -> "3.20", "kg"
+_TOTALES = re.compile(r"^(OP(ERACION)? GRAVADA|VALOR (DE )?VENTA|SUB ?TOTAL|IMPORTE TOTAL|TOTAL)\b")
+
+
+def texto_pdf(file_bytes: bytes) -> str:
+    """Capa de texto del PDF (todas las páginas); vacío si es un escaneo o no se puede leer."""
+    try:
+        lector = PdfReader(BytesIO(file_bytes))
+        texto = "\n".join(pagina.extract_text() or "" for pagina in lector.pages)
+    except Exception:
+        return ""
+    return texto if len(texto.strip()) >= MIN_CARACTERES_TEXTO else ""
+
+
+def huella(texto: str):
+    # el primer RUC del documento es el del emisor (encabezado); sin RUC no hay plantilla
+    m = _RUC.search(texto)
+    return m.group(0) if m else None
+
+
+def _es_numero(token: str) -> bool:
+    return bool(_NUMERO.match(token))
+
+
+def _tramo(linea: list, descripcion: str):
+    # (i, j) de los tokens que forman la descripción (comparada sin espacios ni signos)
+    objetivo = normalizar(descripcion).replace(" ", "")
+    if not objetivo:
+        return None
+    for i in range(len(linea)):
+        if not normalizar(linea[i]):
+            continue  # separadores ("|", "-") no abren la descripción
+        for j in range(i + 1, len(linea) + 1):
+            tramo = normalizar(" ".join(linea[i:j])).replace(" ", "")
+            if tramo == objetivo:
+                return i, j
+            if not objetivo.startswith(tramo):
+                break
+    return None
+
+
+def _roles(linea: list, fila: dict):
+    """Rol de cada token de la línea según la fila confirmada; None si la descripción no está en la línea.
+
+    Roles: un campo (cantidad, pu, importe, desc, um), un campo con su unidad pegada ("importe+um"
+    para "3.20kg"), "descripcion" (un solo rol para todo el tramo), "#" (otro número) o "=<palabra>"
+    (otra palabra, que debe repetirse tal cual: "=UND", "=S/", "=|").
+    """
+    tramo = _tramo(linea, fila["descripcion"])
+    if tramo is None:
+        return None
+    i, j = tramo
+    pegados = [_NUMERO_CON_UNIDAD.match(token) for token in linea]
+    valores = a_numero(pd.Series([m.group(1) if m else token for m, token in zip(pegados, linea)], dtype=object)).to_numpy()
+    libres = list(CAMPOS_NUMERICOS)
+    um = str(fila.get("um") or "").strip().lower()
+    roles = []
+    for k, token in enumerate(linea):
+        if i <= k < j:
+            if k == i:
+                roles.append("descripcion")
+            continue
+        con_um = bool(um) and pegados[k] is not None and pegados[k].group(2).lower() == um
+        if _es_numero(token) or con_um:
+            campo = next((c for c in libres if abs(valores[k] - float(fila.get(c) or 0)) < 1e-6), None)
+            if campo is not None:
+                libres.remove(campo)
+            if con_um and campo:
+                roles.append(f"{campo}+um")
+                um = ""  # la unidad ya tiene su token
+            else:
+                roles.append(campo or ("#" if _es_numero(token) else "=" + token))
+        elif um and token.lower() == um:
+            roles.append("um")
+            um = ""
+        else:
+            roles.append("=" + token)
+    return roles
+
+
+def _coincidir(linea: list, roles: list):
+    """{campo: texto} si la línea tiene la forma de la plantilla; la descripción absorbe los tokens sobrantes."""
+    d = roles.index("descripcion")
+    antes, despues = roles[:d], roles[d + 1:]
+    if len(linea) < len(roles):
+        return None
+    tramo = linea[len(antes):len(linea) - len(despues)]
+    if not normalizar(tramo[0]) or not normalizar(tramo[-1]):
+        return None  # la descripción empieza o termina en un separador: la línea tiene otra forma
+    fijos = list(zip(antes, linea[:len(antes)])) + list(zip(despues, linea[len(linea) - len(despues):]))
+    fila = {"descripcion": " ".join(tramo)}
+    for rol, token in fijos:
+        if rol.endswith("+um"):
+            m = _NUMERO_CON_UNIDAD.match(token)
+            if m is None:
+                return None
+            fila[rol[:-3]], fila["um"] = m.groups()
+            continue
+        if rol.startswith("="):
+            if token != rol[1:]:
+                return None
+            continue
+        if (rol == "um") == _es_numero(token):
+            return None
+        if rol != "#":
+            fila[rol] = token
+    if ARRASTRE.match(normalizar(fila["descripcion"])) or (len(tramo) == 1 and _es_numero(tramo[0])):
+        return None
+    return fila
+
+
+def _parece_item(linea: list) -> bool:
+    # palabra(s) y al menos dos números, terminando en número: forma de una línea de detalle
+    numericos = [_es_numero(t) or _NUMERO_CON_UNIDAD.match(t) is not None for t in linea]
+    palabras = any(normalizar(t) and not n for t, n in zip(linea, numericos))
+    return palabras and sum(numericos) >= 2 and numericos[-1]
+
+
+def _aplicar(texto: str, patrones: list) -> tuple:
+    """(filas, líneas sin forma): filas de las líneas que tienen la forma de algún patrón y cuántas
+    líneas del detalle (después del último RUC y antes de los totales) parecen ítems pero no la tienen."""
+    lineas = [l.split() for l in texto.splitlines()]
+    inicio = max((k + 1 for k, l in enumerate(lineas) if _RUC.search(" ".join(l))), default=0)
+    filas, sin_forma, en_detalle = [], 0, True
+    for k, linea in enumerate(lineas):
+        fila = next((f for f in (_coincidir(linea, roles) for roles in patrones) if f is not None), None)
+        if fila is not None:
+            filas.append(fila)
+            continue
+        if _TOTALES.match(normalizar(" ".join(linea))):
+            en_detalle = False
+        elif k >= inicio and en_detalle and linea and not ARRASTRE.match(normalizar(" ".join(linea))):
+            sin_forma += _parece_item(linea)
+    return filas, sin_forma
+
+
+def _detalle(filas: list, proveedor: str, um: str) -> pd.DataFrame:
+    items = pd.DataFrame(filas, columns=COLUMNAS)
+    items["proveedor"] = proveedor
+    items["um"] = items["um"].fillna(um)
+    items["desc"] = items["desc"].fillna(0)
+    return normalizar_items(items)
+
+
+def _cuadra(texto: str, importes: pd.Series) -> bool:
+    # la suma de importes coincide con alguno de los totales del documento (gravada, subtotal o total)
+    totales = []
+    for linea in texto.splitlines():
+        tokens = linea.split()
+        if _TOTALES.match(normalizar(linea)) and tokens and _es_numero(tokens[-1]):
+            totales.append(tokens[-1])
+    suma = float(importes.sum())
+    tolerancia = 0.01 * (len(importes) + 1)  # redondeo de cada línea
+    return any(abs(suma - t) <= tolerancia for t in a_numero(pd.Series(totales, dtype=object)))
+
+
+def _reproduce(texto: str, patrones: list, items: pd.DataFrame, um: str) -> bool:
+    # la plantilla vale si, aplicada al mismo documento, devuelve exactamente las filas confirmadas (todas las columnas)
+    filas, _ = _aplicar(texto, patrones)
+    if len(filas) != len(items):
+        return False
+    extraidas = _detalle(filas, items["proveedor"].iloc[0], um)
+    if not np.allclose(extraidas[CAMPOS_NUMERICOS].to_numpy(float), items[CAMPOS_NUMERICOS].to_numpy(float)):
+        return False
+    return all(
+        [normalizar(v) for v in extraidas[col]] == [normalizar(v) for v in items[col]]
+        for col in ["proveedor", "descripcion", "um"]
+    )
+
+
+class PlantillasProveedor:
+    """Formato del detalle de cada proveedor recurrente, aprendido de sus facturas PDF confirmadas.
+
+    La plantilla se identifica por el RUC del emisor y guarda la forma de cada línea de ítem (qué
+    token es cantidad, precio, unidad o descripción). Solo se guarda si, aplicada al mismo PDF,
+    reproduce las filas confirmadas; se usa en lugar del modelo de visión cuando la confirmaron
+    `MIN_CONFIRMACIONES` facturas distintas (por hash) seguidas con el mismo formato. Si en las
+    facturas confirmadas la suma de importes cuadraba con el total, también se exige al extraer.
+    """
+
+    def __init__(self, cache: CacheDisco):
+        self.cache = cache
+
+    def aprender(self, texto: str, items: pd.DataFrame, documento: str = None) -> bool:
+        """`documento`: hash del archivo confirmado (por defecto, del texto); confirmar dos veces
+        la misma factura no cuenta como una segunda confirmación."""
+        clave = huella(texto) if texto else None
+        if clave is None or items.empty:
+            return False
+        documento = documento or hashlib.sha1(texto.encode("utf-8")).hexdigest()
+        items = normalizar_items(items.reindex(columns=COLUMNAS)).reset_index(drop=True)
+        um = items["um"].replace("", pd.NA).dropna()
+        um = um.mode().iloc[0] if not um.empty else ""
+        lineas = [l.split() for l in texto.splitlines()]
+        patrones = []
+        for fila in items.to_dict(orient="records"):
+            roles = next((r for r in (_roles(l, fila) for l in lineas) if r is not None), None)
+            if roles is None:
+                return False
+            if roles not in patrones:
+                patrones.append(roles)
+        previa = self.cache.get(clave)
+        documentos, cuadra = [documento], _cuadra(texto, items["importe"])
+        if previa is not None and "documentos" in previa:
+            unidos = previa["patrones"] + [p for p in patrones if p not in previa["patrones"]]
+            if _reproduce(texto, unidos, items, um):
+                patrones = unidos
+                documentos = [d for d in previa["documentos"] if d != documento][-(MAX_DOCUMENTOS - 1):] + documentos
+                cuadra = cuadra and previa["cuadra"]
+        if not _reproduce(texto, patrones, items, um):
+            return False
+        self.cache.set(clave, {
+            "proveedor": items["proveedor"].iloc[0],
+            "um": um,
+            "patrones": patrones,
+            "documentos": documentos,
+            "cuadra": cuadra,
+        })
+        return True
+
+    def extraer(self, texto: str):
+        """Detalle de ítems con la plantilla del emisor; None (modelo de visión) si no hay una
+        confirmada, no encuentra filas, alguna línea del detalle parece un ítem pero no tiene la
+        forma aprendida o las filas no cuadran con el total del documento."""
+        clave = huella(texto) if texto else None
+        plantilla = self.cache.get(clave) if clave else None
+        if plantilla is None or len(plantilla.get("documentos", [])) < MIN_CONFIRMACIONES:
+            return None
+        filas, sin_forma = _aplicar(texto, plantilla["patrones"])
+        if not filas or sin_forma:
+            return None
+        items = _detalle(filas, plantilla["proveedor"], plantilla["um"])
+        if plantilla["cuadra"] and not _cuadra(texto, items["importe"]):
+            return None
+        return items
+
+
+def plantillas_proveedor(path: str = PLANTILLAS_PATH) -> PlantillasProveedor:
+    # sin TTL: la plantilla se reemplaza sola cuando el proveedor cambia de formato
+    return PlantillasProveedor(CacheDisco(path, ttl_segundos=None, max_entradas=5000))
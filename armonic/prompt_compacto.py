@@ -0,0 +1,58 @@
+# armonic/prompt_compacto.py
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# presupuesto de tokens para la tabla del prompt (configurable por entorno)
+PRESUPUESTO_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "1500"))
+CHARS_POR_TOKEN = 4  # aproximación para JSON en español, sin depender de un tokenizer
+TOP_K = 10
+
+
+def estimar_tokens(texto: str) -> int:
+    return -(-len(texto) // CHARS_POR_TOKEN)
+
+
+def top_k(puntaje, k: int) -> np.ndarray:
+    # posiciones de los k mayores puntajes (argpartition, O(n)), de mayor a menor; NaN al final
+    valores = np.nan_to_num(np.asarray(puntaje, dtype=float), nan=-np.inf)
+    k = min(k, len(valores))
+    if k <= 0:
+        return np.empty(0, dtype=int)
+    idx = np.argpartition(-valores, k - 1)[:k]
+    return idx[np.argsort(-valores[idx], kind="stable")]
+
+
+def compactar_tabla(
+    df: pd.DataFrame,
+    columnas: list,
+    resumen: dict,
+    rankings: dict,
+    max_tokens: int = PRESUPUESTO_TOKENS,
+    k: int = TOP_K,
+    decimales: int = 2,
+) -> str:
+    """Serializa una tabla para el prompt con tamaño acotado.
+
+    Devuelve un JSON con `resumen` (estadísticas ya calculadas sobre toda la tabla) y `filas`:
+    la unión de las top-k filas de cada criterio de `rankings` ({nombre: puntaje por fila}),
+    cada una marcada con los criterios por los que entró. Si el texto excede `max_tokens`
+    se reduce k a la mitad hasta que entre, así el prompt no crece con la tabla.
+    """
+    base = df[columnas].round(decimales).reset_index(drop=True)
+    puntajes = {nombre: np.asarray(p, dtype=float) for nombre, p in rankings.items()}
+    while True:
+        motivos = {}
+        for nombre, puntaje in puntajes.items():
+            for i in top_k(puntaje, k):
+                motivos.setdefault(int(i), []).append(nombre)
+        orden = list(motivos)
+        filas = base.iloc[orden].to_dict(orient="records")
+        for fila, i in zip(filas, orden):
+            fila["top"] = motivos[i]
+        texto = json.dumps({"resumen": resumen, "filas": filas}, ensure_ascii=False, separators=(",", ":"), default=str)
+        if estimar_tokens(texto) <= max_tokens or k == 0:
+            return texto
+        k //= 2
@@ -0,0 +1,116 @@
+# armonic/pronostico.py
+import numpy as np
+import pandas as pd
+
+DIAS_AJUSTE = 182  # 26 semanas de historia para ajustar
+HORIZONTE_REFERENCIA = 90  # horizonte sobre el que se acota la tendencia (la ventana más larga)
+
+
+def _disenio(t: np.ndarray, dow: np.ndarray) -> np.ndarray:
+    # [1, t, lun..sáb]: nivel + tendencia lineal + efecto aditivo por día de semana (domingo = base)
+    X = np.zeros(t.shape + (8,))
+    X[..., 0] = 1.0
+    X[..., 1] = t
+    dummies = dow[..., None] == np.arange(6)
+    X[..., 2:] = dummies
+    return X
+
+
+def _minimos_cuadrados(X: np.ndarray, y: np.ndarray, w: np.ndarray) -> np.ndarray:
+    # (..., n, k), (..., n), (..., n) -> (..., k); pinv admite lotes de sistemas (lstsq no)
+    return (np.linalg.pinv(X * w[..., None]) @ (y * w)[..., None])[..., 0]
+
+
+class PronosticoEstacional:
+    """Tendencia lineal + estacionalidad por día de semana sobre las órdenes diarias.
+
+    Se ajusta por mínimos cuadrados ponderados (las semanas recientes pesan más) sobre los
+    últimos `dias_ajuste` días; predecir cualquier horizonte es un producto matriz-vector, y un
+    horizonte corto son los primeros días de uno largo.
+    """
+
+    def __init__(self, dias_ajuste: int = DIAS_AJUSTE, vida_media: float = 56.0, tendencia_max: float = 0.15,
+                 horizonte_referencia: int = HORIZONTE_REFERENCIA):
+        self.dias_ajuste = dias_ajuste
+        self.vida_media = vida_media  # días para que el peso de una observación caiga a la mitad
+        # la tendencia no mueve el nivel más de ±15% en `horizonte_referencia` días; el límite no
+        # depende del horizonte pedido para que predecir(14) sea el inicio de predecir(90)
+        self.tendencia_max = tendencia_max
+        self.horizonte_referencia = horizonte_referencia
+        self.coef = None
+        self.ultima_fecha = None
+        self.nivel = None
+
+    @staticmethod
+    def _serie_diaria(fechas, valores) -> pd.Series:
+        serie = pd.Series(np.asarray(valores, dtype=np.float64), index=pd.DatetimeIndex(fechas).floor("D"))
+        # días sin ventas (local cerrado) cuentan como 0
+        return serie.groupby(level=0).sum().asfreq("D", fill_value=0.0)
+
+    def _pesos(self, t: np.ndarray) -> np.ndarray:
+        return np.sqrt(0.5 ** (-t / self.vida_media))
+
+    def _prediccion(self, coef: np.ndarray, nivel, t: np.ndarray, dow: np.ndarray) -> np.ndarray:
+        # coef (..., k), nivel (...), t/dow (..., h) -> (..., h)
+        if coef.shape[-1] > 1:
+            # acotar la tendencia para que horizontes largos no se disparen
+            limite = self.tendencia_max * np.asarray(nivel) / self.horizonte_referencia
+            coef = coef.copy()
+            coef[..., 1] = np.clip(coef[..., 1], -limite, limite)
+            X = _disenio(t, dow)
+        else:
+            X = np.ones(t.shape + (1,))
+        return np.maximum((X @ coef[..., None])[..., 0], 0.0)
+
+    def ajustar(self, fechas, valores) -> "PronosticoEstacional":
+        serie = self._serie_diaria(fechas, valores).iloc[-self.dias_ajuste:]
+
+        n = len(serie)
+        t = np.arange(n, dtype=np.float64) - (n - 1)  # t = 0 en el último día observado
+        dow = serie.index.dayofweek.to_numpy()
+        X = _disenio(t, dow)
+        y = serie.to_numpy()
+        w = self._pesos(t)
+        if n < 14:
+            X = X[:, [0]]  # muy poca historia: solo nivel
+        self.coef = _minimos_cuadrados(X, y, w)
+        self.ultima_fecha = serie.index[-1]
+        self.nivel = max(float(np.average(y, weights=w ** 2)), 1e-9)
+        return self
+
+    def predecir_origenes(self, fechas, valores, finales, horizonte: int) -> np.ndarray:
+        """Predicción diaria (origen x día) de un modelo ajustado con la historia hasta cada fecha de
+        `finales` (inclusive), todos los orígenes en un solo ajuste por lotes. La fila o es igual a
+        `ajustar(historia hasta finales[o]).predecir(horizonte)["prediccion"]`; no cambia el modelo."""
+        serie = self._serie_diaria(fechas, valores)
+        fin = serie.index.get_indexer(pd.DatetimeIndex(finales).floor("D"))
+        if (fin < 0).any():
+            raise ValueError("fecha final fuera del rango de la serie")
+        # ventana de ajuste de cada origen: sus últimos dias_ajuste días; los anteriores al
+        # primer día de la serie pesan 0, así todas las ventanas tienen el mismo largo
+        desplazamiento = np.arange(-self.dias_ajuste + 1, 1)
+        pos = fin[:, None] + desplazamiento
+        valida = pos >= 0
+        if (valida.sum(axis=1) < 14).any():
+            raise ValueError("cada origen necesita al menos 14 días de historia")
+        pos = np.maximum(pos, 0)
+        t = np.broadcast_to(desplazamiento.astype(np.float64), pos.shape)
+        dow = serie.index.dayofweek.to_numpy()
+        y = serie.to_numpy()[pos]
+        w = self._pesos(t) * valida
+        coef = _minimos_cuadrados(_disenio(t, dow[pos]), y, w)
+        nivel = np.maximum((y * w ** 2).sum(axis=1) / (w ** 2).sum(axis=1), 1e-9)
+
+        dias = np.arange(1, horizonte + 1)
+        t_pred = np.broadcast_to(dias.astype(np.float64), (len(fin), horizonte))
+        return self._prediccion(coef, nivel, t_pred, (dow[fin][:, None] + dias) % 7)
+
+    def predecir(self, horizonte: int) -> dict:
+        """Mismo formato que los antiguos data/predictN.json: {"fechas": [...], "prediccion": [...]}."""
+        fechas = pd.date_range(self.ultima_fecha + pd.Timedelta(days=1), periods=horizonte, freq="D")
+        t = np.arange(1, horizonte + 1, dtype=np.float64)
+        prediccion = self._prediccion(self.coef, self.nivel, t, fechas.dayofweek.to_numpy())
+        return {
+            "fechas": fechas.strftime("%Y-%m-%d").tolist(),
+            "prediccion": prediccion.tolist(),
+        }
@@ -0,0 +1,48 @@
+# armonic/proporciones.py
+import numpy as np
+import pandas as pd
+
+PROPORCIONES_COLS = ["id", "name", "p", "q"]
+
+
+def calcular_proporciones(df: pd.DataFrame) -> pd.DataFrame:
+    """Calcula `p` (fracción de días con venta) y `q` (cantidad media por día con venta)
+    por producto en una sola pasada vectorizada.
+
+    Devuelve el mismo frame que el antiguo loop sobre `df.groupby("name")`:
+    una fila por nombre (orden alfabético), `id` de la primera aparición.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=PROPORCIONES_COLS)
+
+    # 1) códigos enteros por nombre (en orden de aparición) y por día
+    name_codes, nombres = pd.factorize(df["name"])
+    day_codes, dias = pd.factorize(df["day"], use_na_sentinel=False)
+    total_dias = len(dias)
+
+    valid = name_codes >= 0  # groupby descarta nombres nulos
+    name_codes = name_codes[valid]
+    day_codes = day_codes[valid]
+    n_productos = len(nombres)
+
+    # 2) días distintos por producto: pares (producto, día) únicos
+    pares = pd.unique(name_codes.astype(np.int64) * total_dias + day_codes)
+    apariciones_diarias = np.bincount(pares // total_dias, minlength=n_productos)
+
+    # 3) cantidad total por producto
+    cantidad = df["cantidad"].to_numpy(dtype=np.float64)[valid]
+    cantidad_total = np.bincount(name_codes, weights=cantidad, minlength=n_productos)
+
+    # 4) id de la primera fila de cada producto: con códigos en orden de aparición,
+    #    el máximo acumulado sube justo en la primera fila de cada código
+    primera_fila = np.flatnonzero(np.diff(np.maximum.accumulate(name_codes), prepend=-1) > 0)
+    ids = df["id"].to_numpy()[valid][primera_fila]
+
+    # 5) mismo orden que groupby: alfabético por nombre
+    orden = np.argsort(np.asarray(nombres), kind="stable")
+    return pd.DataFrame({
+        "id": ids[orden],
+        "name": np.asarray(nombres, dtype=object)[orden],
+        "p": apariciones_diarias[orden] / total_dias,
+        "q": cantidad_total[orden] / apariciones_diarias[orden],
+    })
@@ -0,0 +1,147 @@
+# armonic/recetas.py
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from armonic.cache_disco import firma_archivo
+
+RECETAS_PATH = os.path.join("data", "recetas_completas.csv")
+COLUMNA_AJUSTE = "Ajuste de negocio(%)"
+
+
+class MatrizRecetas:
+    """Recetas como matriz dispersa producto x insumo (cantidad de insumo por unidad vendida).
+
+    Se construye una vez por archivo de recetas; los requerimientos de insumos para cualquier
+    demanda (un vector por producto o una matriz producto x días/sedes) salen de un solo
+    producto matricial.
+    """
+
+    def __init__(self, productos, insumos, unidades, costos, matriz):
+        self.productos = np.asarray(productos, dtype=object)  # ids de producto como texto (hay códigos tipo "ALM-000004")
+        self.insumos = np.asarray(insumos)
+        self.unidades = np.asarray(unidades, dtype=object)
+        self.costos = np.asarray(costos, dtype=np.float64)
+        self.matriz = matriz  # csr (productos, insumos)
+        self._indice = pd.Index(self.productos)
+
+    @classmethod
+    def desde_frame(cls, recetas: pd.DataFrame) -> "MatrizRecetas":
+        # columnas de recetas_completas.csv: id, name, id_insumo, um_insumo, cantidad, costo_unitario
+        recetas = recetas.dropna(subset=["id", "id_insumo"])
+        filas, productos = pd.factorize(recetas["id"].astype(str), sort=True)
+        cols, insumos = pd.factorize(recetas["id_insumo"].astype(np.int64), sort=True)
+        # filas repetidas (mismo producto e insumo) se suman al armar la csr
+        matriz = sparse.csr_matrix(
+            (recetas["cantidad"].to_numpy(dtype=np.float64), (filas, cols)),
+            shape=(len(productos), len(insumos)),
+        )
+        por_insumo = recetas.groupby(cols, sort=True)
+        return cls(
+            productos,
+            insumos,
+            por_insumo["um_insumo"].first().to_numpy(),
+            por_insumo["costo_unitario"].mean().to_numpy(),
+            matriz,
+        )
+
+    @classmethod
+    def desde_csv(cls, path: str) -> "MatrizRecetas":
+        return cls.desde_frame(pd.read_csv(path, dtype={"id": str}))
+
+    def __len__(self):
+        return len(self.productos)
+
+    def filas(self, ids) -> np.ndarray:
+        # fila de la matriz de cada producto (-1 si no tiene receta)
+        return self._indice.get_indexer(pd.Index(ids).astype(str))
+
+    def requerimientos(self, ids, demanda) -> np.ndarray:
+        """Insumos necesarios para `demanda` (forma (n,) o (n, k), alineada con `ids`).
+
+        Devuelve (insumos,) o (insumos, k). Los productos sin receta no aportan.
+        """
+        demanda = np.asarray(demanda, dtype=np.float64)
+        filas = self.filas(ids)
+        con_receta = filas >= 0
+        # demanda alineada a las filas de la matriz (productos sin venta = 0)
+        alineada = np.zeros((len(self.productos),) + demanda.shape[1:], dtype=np.float64)
+        np.add.at(alineada, filas[con_receta], demanda[con_receta])
+        return np.asarray(self.matriz.T @ alineada)
+
+    def a_frame(self, requerimiento: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({
+            "id_insumo": self.insumos,
+            "um": self.unidades,
+            "cantidad": requerimiento,
+            "costo_estimado": requerimiento * self.costos,
+        })
+
+
+_MATRICES = {}  # ruta -> (firma, matriz): solo la última versión de cada archivo
+
+
+def cargar_matriz(path: str = RECETAS_PATH):
+    """Matriz de recetas compartida por páginas y sesiones; se rearma solo si cambia el archivo
+    (fecha de modificación o tamaño), sin leerlo en cada rerun. None si no existe."""
+    if not os.path.exists(path):
+        return None
+    firma = firma_archivo(path)
+    guardada = _MATRICES.get(firma[0])
+    if guardada is None or guardada[0] != firma:
+        _MATRICES[firma[0]] = (firma, MatrizRecetas.desde_csv(path))
+    return _MATRICES[firma[0]][1]
+
+
+class RequerimientoIncremental:
+    """Insumos requeridos por la tabla de gestión de productos, actualizados por deltas.
+
+    Se arma una vez por tabla (un producto matricial); cuando cambia el ajuste de negocio de
+    un producto solo se suma su fila de recetas escalada por la diferencia de Total, O(insumos
+    de esa receta) en vez de recalcular todos los productos.
+    """
+
+    def __init__(self, bom: MatrizRecetas, gestion: pd.DataFrame):
+        self.bom = bom
+        self.gestion = gestion  # referencia: si la tabla cambia (otra ventana/pronóstico) se rearma
+        self.filas = bom.filas(gestion["id"])
+        self.estimacion = gestion["Estimacion"].to_numpy(dtype=np.float64)
+        self.ajustes_base = gestion[COLUMNA_AJUSTE].to_numpy(dtype=np.float64)
+        self.ajustes = self.ajustes_base.copy()
+        self.totales = bom.requerimientos(gestion["id"], self.total_productos())
+        self.editadas = set()
+
+    def total_productos(self, filas=slice(None)) -> np.ndarray:
+        return self.estimacion[filas] * (1 + self.ajustes[filas])
+
+    def ajustar(self, fila: int, ajuste: float):
+        delta = self.estimacion[fila] * (ajuste - self.ajustes[fila])
+        self.ajustes[fila] = ajuste
+        r = self.filas[fila]
+        if r < 0 or delta == 0:
+            return
+        m = self.bom.matriz
+        i, j = m.indptr[r], m.indptr[r + 1]
+        self.totales[m.indices[i:j]] += delta * m.data[i:j]
+
+    def aplicar_cambios(self, edited_rows: dict, columna: str = COLUMNA_AJUSTE) -> list:
+        """Aplica el `edited_rows` de un st.data_editor (acumulado respecto a la tabla base).
+
+        Filas que ya no figuran como editadas vuelven a su ajuste base. Devuelve las filas que cambiaron.
+        """
+        nuevas = {int(fila): cambios[columna] for fila, cambios in edited_rows.items() if columna in cambios}
+        for fila in self.editadas - nuevas.keys():
+            nuevas[fila] = self.ajustes_base[fila]
+        cambiadas = []
+        for fila, valor in nuevas.items():
+            valor = 0.0 if valor is None else float(valor)
+            if valor != self.ajustes[fila]:
+                self.ajustar(fila, valor)
+                cambiadas.append(fila)
+        self.editadas = {fila for fila in nuevas if self.ajustes[fila] != self.ajustes_base[fila]}
+        return cambiadas
+
+    def serie(self) -> pd.Series:
+        return pd.Series(self.totales, index=self.bom.insumos)
@@ -0,0 +1,101 @@
+# armonic/xml_ubl.py
+import io
+import os
+import zipfile
+
+import pandas as pd
+from lxml import etree
+
+from armonic.normalizacion import normalizar_items
+
+NS = {
+    "cac": "urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2",
+    "cbc": "urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2",
+}
+TAG_LINEA = f"{{{NS['cac']}}}InvoiceLine"
+TAG_PROVEEDOR = f"{{{NS['cac']}}}AccountingSupplierParty"
+COLUMNAS = ["proveedor", "descripcion", "cantidad", "pu", "desc", "importe", "um"]
+FILAS_POR_CHUNK = 5000
+
+# XPath compilados una vez y relativos al elemento (sin búsquedas ".//" que recorren todo el subárbol)
+_DESCRIPCION = etree.XPath("string((cac:Item/cbc:Description | cbc:Description)[1])", namespaces=NS)
+_CANTIDAD = etree.XPath("cbc:InvoicedQuantity", namespaces=NS)
+_PRECIO = etree.XPath("string(cac:Price/cbc:PriceAmount)", namespaces=NS)
+_IMPORTE = etree.XPath("string(cbc:LineExtensionAmount)", namespaces=NS)
+_DESCUENTO = etree.XPath("string(cac:AllowanceCharge/cbc:Amount)", namespaces=NS)
+_RAZON_SOCIAL = etree.XPath(
+    "string((cac:Party/cac:PartyLegalEntity/cbc:RegistrationName | cac:Party/cac:PartyName/cbc:Name)[1])",
+    namespaces=NS,
+)
+
+
+def _fila(linea) -> dict:
+    # textos crudos: números y mayúsculas se normalizan por columna al armar el DataFrame
+    cantidad = _CANTIDAD(linea)
+    return {
+        "proveedor": "",
+        "descripcion": _DESCRIPCION(linea),
+        "cantidad": cantidad[0].text if cantidad else "",
+        "pu": _PRECIO(linea),
+        "desc": _DESCUENTO(linea),
+        "importe": _IMPORTE(linea),
+        "um": cantidad[0].get("unitCode") or "" if cantidad else "",
+    }
+
+
+def filas_factura(fuente) -> list:
+    """Ítems de una factura UBL (bytes, ruta o archivo) leídos en streaming.
+
+    Cada InvoiceLine y el AccountingSupplierParty se procesan al cerrarse y se liberan enseguida:
+    la memoria no depende del tamaño del documento.
+    """
+    if isinstance(fuente, (bytes, bytearray)):
+        fuente = io.BytesIO(fuente)
+    filas = []
+    proveedor = ""
+    contexto = etree.iterparse(fuente, events=("end",), tag=(TAG_LINEA, TAG_PROVEEDOR), recover=True, huge_tree=True)
+    for _, elem in contexto:
+        if elem.tag == TAG_PROVEEDOR:
+            proveedor = _RAZON_SOCIAL(elem)
+        else:
+            filas.append(_fila(elem))
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    for fila in filas:  # el proveedor suele venir antes de las líneas, pero no se asume
+        fila["proveedor"] = proveedor
+    return filas
+
+
+def parse_xml(xml_bytes: bytes) -> pd.DataFrame:
+    return normalizar_items(pd.DataFrame(filas_factura(xml_bytes), columns=COLUMNAS))
+
+
+def _fuentes(origen):
+    # (nombre, archivo abierto) por cada XML de un ZIP (ruta o bytes) o de un directorio
+    if isinstance(origen, (bytes, bytearray)) or (isinstance(origen, str) and zipfile.is_zipfile(origen)):
+        with zipfile.ZipFile(io.BytesIO(origen) if isinstance(origen, (bytes, bytearray)) else origen) as z:
+            for nombre in sorted(z.namelist()):
+                if nombre.lower().endswith(".xml"):
+                    with z.open(nombre) as f:
+                        yield nombre, f
+    else:
+        for nombre in sorted(os.listdir(origen)):
+            if nombre.lower().endswith(".xml"):
+                with open(os.path.join(origen, nombre), "rb") as f:
+                    yield nombre, f
+
+
+def iterar_lote(origen, filas_por_chunk: int = FILAS_POR_CHUNK):
+    """DataFrames de hasta `filas_por_chunk` ítems (con columna `archivo`) de todas las facturas XML
+    de un ZIP o directorio. Solo hay un chunk en memoria a la vez."""
+    chunk = []
+    for nombre, f in _fuentes(origen):
+        for fila in filas_factura(f):
+            fila["archivo"] = nombre
+            chunk.append(fila)
+            if len(chunk) >= filas_por_chunk:
+                yield normalizar_items(pd.DataFrame(chunk, columns=COLUMNAS + ["archivo"]))
+                chunk = []
+    if chunk:
+        yield normalizar_items(pd.DataFrame(chunk, columns=COLUMNAS + ["archivo"]))
@@ -0,0 +1,234 @@
+# benchmarks/backtest.py
+# Backtest rolling-origin del pipeline demanda -> asignación:
+#   órdenes diarias (PronosticoEstacional) x avg_items_per_order (metadata.json)
+#   -> proporciones p, q (calcular_proporciones) -> reparto por producto (asignar_lote)
+#   Todas las etapas corren para todos los orígenes a la vez (sin loop por origen); las versiones
+#   vectorizadas se verifican origen por origen contra calcular_proporciones y ajustar/predecir, y las
+#   funciones de producción se miden aparte (proporciones_app, pronostico_app) sobre todo el histórico.
+#
+# Uso:
+#   python -m benchmarks.backtest --origenes 24 [--repeticiones 5]
+#   python -m benchmarks.backtest --guardar-base benchmarks/backtest_base.json
+#   python -m benchmarks.backtest --base benchmarks/backtest_base.json   # exit 1 si hay regresión
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from armonic.asignacion import asignar_lote
+from armonic.cache_historico import leer_csv_ventas
+from armonic.pronostico import DIAS_AJUSTE, PronosticoEstacional
+from armonic.proporciones import calcular_proporciones
+
+PATH_HISTORICO = os.path.join("data", "historico_de_ventas_corrected.csv")
+PATH_METADATA = os.path.join("data", "metadata.json")
+VENTANAS = [14, 30, 90]
+
+TOLERANCIA_ERROR = 0.01  # +1 punto de WAPE / error total
+TOLERANCIA_EQUIVALENCIA = 1e-9  # error relativo entre la versión vectorizada y la de producción
+TOLERANCIA_TIEMPO = 2.0  # x2 el tiempo de la base (las máquinas varían)
+PISO_TIEMPO = 0.001  # etapas de menos de 1 ms no se comparan: a esa escala la diferencia es ruido
+AVISO_SESGO = 0.25  # sesgo del total de unidades que se informa aunque no empeore respecto a la base
+
+
+def medir(nombre, fn, reporte, repeticiones):
+    """Corre la etapa `fn` y devuelve su resultado; anota pico de memoria y tiempo por llamada.
+
+    El pico sale de una corrida con tracemalloc (incluye los buffers de NumPy/pandas). El tiempo se
+    mide aparte, sin tracemalloc: cada medición repite la etapa hasta durar >= 0,2 s (autorange)
+    y se queda la mejor de `repeticiones`, así una etapa de pocos ms tiene un tiempo estable.
+    """
+    tracemalloc.start()
+    resultado = fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    temporizador = timeit.Timer(fn)
+    vueltas, _ = temporizador.autorange()
+    segundos = min(temporizador.repeat(repeat=repeticiones, number=vueltas)) / vueltas
+    reporte[nombre] = {"segundos": segundos, "pico_mb": pico / 2**20}
+    return resultado
+
+
+def matriz_diaria(df, dias, nombres):
+    # producto x día de cantidades, para sacar lo realmente vendido en cualquier ventana con cumsum
+    fila = np.searchsorted(dias, df["day"].to_numpy())
+    col = pd.Index(nombres).get_indexer(df["name"])
+    M = np.zeros((len(dias), len(nombres)))
+    np.add.at(M, (fila, col), df["cantidad"].to_numpy(dtype=np.float64))
+    return np.vstack([np.zeros((1, len(nombres))), np.cumsum(M, axis=0)])
+
+
+def correr(df, avg_items_per_order, n_origenes, repeticiones=5):
+    reporte = {}
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+    df["day"] = df["date"].dt.floor("D")
+    dias = np.sort(df["day"].unique())
+    nombres = np.sort(df["name"].dropna().unique())
+
+    # orígenes: con al menos DIAS_AJUSTE de historia y la ventana más larga completa por delante
+    idx_origenes = np.unique(np.linspace(DIAS_AJUSTE, len(dias) - max(VENTANAS), n_origenes).astype(int))
+    origenes = dias[idx_origenes]
+
+    def matriz_real():
+        C = matriz_diaria(df, dias, nombres)
+        # reales[o, w, i]: unidades vendidas del producto i en [origen, origen + w)
+        return C, np.stack([C[idx_origenes + w] - C[idx_origenes] for w in VENTANAS], axis=1)
+
+    C, reales = medir("matriz_real", matriz_real, reporte, repeticiones)
+
+    # lo mismo que calcular_proporciones(historia) en cada origen, desde la matriz acumulada:
+    # p * q = (días con venta / días) * (cantidad / días con venta) = cantidad hasta el origen / días
+    # (la historia de un origen son sus idx_origenes días con ventas)
+    E = medir("proporciones", lambda: C[idx_origenes] / idx_origenes[:, None], reporte, repeticiones)
+
+    diario = df.groupby("day")["cantidad"].sum()
+
+    def pronostico():
+        # un ajuste por lotes para todos los orígenes (historia hasta el día con ventas anterior);
+        # cada ventana son los primeros días del horizonte más largo
+        prediccion = PronosticoEstacional(horizonte_referencia=max(VENTANAS)).predecir_origenes(
+            diario.index, diario.to_numpy(), dias[idx_origenes - 1], max(VENTANAS)
+        )
+        return prediccion, np.stack([prediccion[:, :w].sum(axis=1) for w in VENTANAS], axis=1)
+
+    prediccion, ordenes = medir("pronostico", pronostico, reporte, repeticiones)
+
+    # lo que corre la app una vez por dataset, sobre todo el histórico
+    medir("proporciones_app", lambda: calcular_proporciones(df), reporte, repeticiones)
+    medir(
+        "pronostico_app",
+        lambda: PronosticoEstacional(horizonte_referencia=max(VENTANAS))
+        .ajustar(diario.index, diario.to_numpy())
+        .predecir(max(VENTANAS)),
+        reporte,
+        repeticiones,
+    )
+    equivalencia = verificar_equivalencia(df, diario, nombres, origenes, E, prediccion)
+
+    def asignacion():
+        targets = np.rint(ordenes * avg_items_per_order).astype(np.int64)
+        # todos los orígenes x ventanas en una sola llamada
+        alloc = asignar_lote(np.repeat(E, len(VENTANAS), axis=0), targets.reshape(-1))
+        return alloc.reshape(len(origenes), len(VENTANAS), len(nombres))
+
+    alloc = medir("asignacion", asignacion, reporte, repeticiones)
+
+    def metricas():
+        error = alloc - reales
+        total_real = reales.sum(axis=2)
+        total_pred = alloc.sum(axis=2)
+        precision = {}
+        por_producto = []
+        for k, w in enumerate(VENTANAS):
+            precision[str(w)] = {
+                # WAPE por producto: sum |asignado - real| / sum real, promedio sobre orígenes
+                "wape_productos": float(np.mean(np.abs(error[:, k]).sum(axis=1) / total_real[:, k])),
+                "error_total": float(np.mean(np.abs(total_pred[:, k] - total_real[:, k]) / total_real[:, k])),
+                "sesgo_total": float(np.mean(total_pred[:, k] / total_real[:, k] - 1)),
+            }
+            por_producto.append(pd.DataFrame({
+                "ventana": w,
+                "name": nombres,
+                "mae": np.abs(error[:, k]).mean(axis=0),
+                "sesgo": error[:, k].mean(axis=0),
+                "real_medio": reales[:, k].mean(axis=0),
+            }))
+        return precision, por_producto
+
+    precision, por_producto = medir("metricas", metricas, reporte, repeticiones)
+
+    return {
+        "origenes": [str(pd.Timestamp(o).date()) for o in origenes],
+        "precision": precision,
+        "equivalencia": equivalencia,
+        "etapas": reporte,
+    }, pd.concat(por_producto, ignore_index=True)
+
+
+def verificar_equivalencia(df, diario, nombres, origenes, E, prediccion) -> list:
+    """Diferencias entre las etapas vectorizadas y las funciones de producción, origen por origen."""
+    fallas = []
+    cortes = np.searchsorted(df["day"].to_numpy(), origenes)  # df ordenado: historia = df[:corte]
+    for o, (origen, corte) in enumerate(zip(origenes, cortes)):
+        prop = calcular_proporciones(df.iloc[:corte])
+        esperado = np.zeros(len(nombres))
+        esperado[pd.Index(nombres).get_indexer(prop["name"])] = (prop["p"] * prop["q"]).to_numpy()
+        if not np.allclose(E[o], esperado, rtol=TOLERANCIA_EQUIVALENCIA, atol=0):
+            fallas.append(f"proporciones en {pd.Timestamp(origen).date()}: distinto de calcular_proporciones")
+        historia = diario[diario.index < origen]
+        modelo = PronosticoEstacional(horizonte_referencia=max(VENTANAS)).ajustar(historia.index, historia.to_numpy())
+        esperado = np.asarray(modelo.predecir(max(VENTANAS))["prediccion"])
+        if not np.allclose(prediccion[o], esperado, rtol=TOLERANCIA_EQUIVALENCIA, atol=TOLERANCIA_EQUIVALENCIA * esperado.max()):
+            fallas.append(f"pronóstico en {pd.Timestamp(origen).date()}: distinto de ajustar + predecir")
+    return fallas
+
+
+def regresiones(resultado, base):
+    # la versión vectorizada debe ser la de producción: si no, la precisión medida no vale
+    fallas = list(resultado["equivalencia"])
+    for w, m in resultado["precision"].items():
+        for metrica in ["wape_productos", "error_total"]:
+            ref = base["precision"].get(w, {}).get(metrica)
+            if ref is not None and m[metrica] > ref + TOLERANCIA_ERROR:
+                fallas.append(f"ventana {w}: {metrica} {m[metrica]:.3f} > base {ref:.3f}")
+    for nombre, m in resultado["etapas"].items():
+        ref = base["etapas"].get(nombre, {}).get("segundos")
+        if ref is not None and m["segundos"] >= PISO_TIEMPO and m["segundos"] > ref * TOLERANCIA_TIEMPO:
+            fallas.append(f"etapa {nombre}: {m['segundos']:.3f}s > {TOLERANCIA_TIEMPO}x base {ref:.3f}s")
+    return fallas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--historico", default=PATH_HISTORICO)
+    parser.add_argument("--origenes", type=int, default=24)
+    parser.add_argument("--repeticiones", type=int, default=5, help="el tiempo de cada etapa es el mejor de N mediciones")
+    parser.add_argument("--por-producto", default=None, help="CSV con el error por producto y ventana")
+    parser.add_argument("--guardar-base", default=None)
+    parser.add_argument("--base", default=None)
+    args = parser.parse_args()
+
+    with open(args.historico, "rb") as f:
+        df = leer_csv_ventas(f.read())
+    with open(PATH_METADATA, "r") as f:
+        avg_items_per_order = json.load(f)["avg_items_per_order"]
+
+    resultado, por_producto = correr(df, avg_items_per_order, args.origenes, max(args.repeticiones, 1))
+
+    print(f"orígenes: {len(resultado['origenes'])} ({resultado['origenes'][0]} .. {resultado['origenes'][-1]})")
+    print(f"{'ventana':>8s} {'WAPE prod.':>11s} {'err. total':>11s} {'sesgo':>8s}")
+    for w, m in resultado["precision"].items():
+        print(f"{w:>8s} {m['wape_productos']:11.3f} {m['error_total']:11.3f} {m['sesgo_total']:+8.3f}")
+    print(f"{'etapa':>16s} {'tiempo':>10s} {'pico':>10s}")
+    for nombre, m in resultado["etapas"].items():
+        print(f"{nombre:>16s} {m['segundos'] * 1000:8.2f}ms {m['pico_mb']:8.1f}MB")
+    if not resultado["equivalencia"]:
+        print(f"etapas vectorizadas = calcular_proporciones y ajustar/predecir en los {len(resultado['origenes'])} orígenes")
+    sesgos = [m["sesgo_total"] for m in resultado["precision"].values()]
+    if max(abs(x) for x in sesgos) > AVISO_SESGO:
+        # la serie diaria ya suma `cantidad` (unidades): multiplicarla por avg_items_per_order las cuenta dos veces
+        print(f"AVISO: sesgo del total de unidades entre {min(sesgos):+.0%} y {max(sesgos):+.0%} según la ventana "
+              "(órdenes diarias en unidades x avg_items_per_order)")
+
+    if args.por_producto:
+        por_producto.to_csv(args.por_producto, index=False)
+    if args.guardar_base:
+        with open(args.guardar_base, "w") as f:
+            json.dump(resultado, f, indent=2)
+    if args.base:
+        with open(args.base, "r") as f:
+            fallas = regresiones(resultado, json.load(f))
+        for falla in fallas:
+            print("REGRESIÓN:", falla)
+        if fallas:
+            sys.exit(1)
+        print("OK: sin regresiones respecto a la base")
+
+
+if __name__ == "__main__":
+    main()
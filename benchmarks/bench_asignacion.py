@@ -0,0 +1,54 @@
+# benchmarks/bench_asignacion.py
+# Uso: python -m benchmarks.bench_asignacion [--escenarios 2700]   (90 días x 30 sucursales)
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from armonic.asignacion import asignar_lote
+
+
+def allocate_loop(df_products, T):
+    # implementación original de pages/demanda.py::allocate_to_target (un objetivo por llamada)
+    df = df_products.copy()
+    sumE = df['E'].sum()
+    df['scaled'] = df['E'] / sumE * T
+    df['floor'] = np.floor(df['scaled']).astype(int)
+    remainder = T - df['floor'].sum()
+    df['frac'] = df['scaled'] - df['floor']
+    df = df.sort_values('frac', ascending=False)
+    df['alloc'] = df['floor'].copy()
+    if remainder > 0:
+        df.loc[df.index[:remainder], 'alloc'] += 1
+    return df.sort_index()['alloc'].to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--productos", type=int, default=170)
+    parser.add_argument("--escenarios", type=int, default=2700)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    E = rng.gamma(0.5, 2.0, size=(args.escenarios, args.productos))
+    targets = rng.integers(50, 500, size=args.escenarios)
+
+    t0 = time.perf_counter()
+    esperado = np.stack([allocate_loop(pd.DataFrame({"E": E[s]}), int(targets[s])) for s in range(args.escenarios)])
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    obtenido = asignar_lote(E, targets)
+    t_lote = time.perf_counter() - t0
+
+    assert (obtenido.sum(axis=1) == targets).all()
+    np.testing.assert_array_equal(obtenido, esperado)
+    print(f"escenarios: {args.escenarios:,} x {args.productos} productos")
+    print(f"loop por escenario : {t_loop * 1000:9.1f} ms")
+    print(f"asignar_lote       : {t_lote * 1000:9.1f} ms  (x{t_loop / t_lote:.0f})")
+    print("OK: mismo reparto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_cache_historico.py
+# Uso: python -m benchmarks.bench_cache_historico [--replicas 220]   (220 réplicas ≈ 10M filas)
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+PATH_HISTORICO = os.path.join("data", "historico_de_ventas_corrected.csv")
+
+
+def generar_csv(path, replicas):
+    df = pd.read_csv(PATH_HISTORICO)
+    fechas = pd.to_datetime(df["fecha"])
+    span = fechas.max().normalize() - fechas.min().normalize() + pd.Timedelta(days=1)
+    with open(path, "w") as f:
+        for i in range(replicas):
+            parte = df.copy()
+            parte["fecha"] = (fechas - i * span).dt.strftime("%Y-%m-%d %H:%M:%S")
+            parte["day"] = parte["fecha"].str[:10]
+            parte.to_csv(f, index=False, header=(i == 0))
+
+
+def correr_modo(modo, path_csv, cache_dir):
+    # se ejecuta en un subproceso para medir el pico de memoria de cada modo por separado
+    from armonic.cache_historico import convertir_historico, leer_historico
+
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if modo == "csv":
+        # flujo original de pages/demanda.py
+        df = pd.read_csv(path_csv)
+        df = df.rename(columns={"fecha":"date", "item_nombre":"name", "codunicopedido":"id_order", "codigo_producto":"id"})
+        df["date"] = pd.to_datetime(df["date"])
+        df["day"] = df["date"].dt.floor("D")
+    elif modo == "frio":
+        with open(path_csv, "rb") as f:
+            path = convertir_historico(f.read(), cache_dir)
+        df = leer_historico(path, columnas=["date", "name", "id", "cantidad"])
+    else:
+        with open(path_csv, "rb") as f:
+            path = convertir_historico(f.read(), cache_dir)
+        df = leer_historico(path, columnas=["date", "name", "id", "cantidad"])
+    dt = time.perf_counter() - t0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+    frame = df.memory_usage(deep=True).sum() / 2**20
+    print(f"{modo:8s} {dt:8.2f} s  {pico / 1024:9.0f} MB  {frame:9.0f} MB  ({len(df):,} filas)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replicas", type=int, default=22)
+    parser.add_argument("--modo", default=None)
+    parser.add_argument("--csv", default=None)
+    parser.add_argument("--cache-dir", default=None)
+    args = parser.parse_args()
+
+    if args.modo:
+        correr_modo(args.modo, args.csv, args.cache_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path_csv = os.path.join(tmp, "historico.csv")
+        generar_csv(path_csv, args.replicas)
+        print(f"CSV: {os.path.getsize(path_csv) / 2**20:.0f} MB")
+        print(f"{'modo':8s} {'tiempo':>10s} {'pico RSS':>12s} {'DataFrame':>12s}")
+        # csv: flujo original | frio: primera carga (conversión) | cache: sesiones siguientes
+        for modo in ["csv", "frio", "cache"]:
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_cache_historico",
+                            "--modo", modo, "--csv", path_csv, "--cache-dir", tmp], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_compra.py
+# Uso: python -m benchmarks.bench_compra [--filas 5000] [--ediciones 200]
+#   costo por edición de una celda en la tabla Gestionar Compra: flujo original (copiar gc_input_df, recalcular
+#   las derivadas de todas las filas y guardar copias en gc_input_df y entradas_insumos_df) vs. TablaCompra
+#   (change set del editor por id de fila, derivadas solo de la fila tocada, un solo frame compartido)
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from armonic.compra import COLUMNAS_DERIVADAS, COLUMNAS_EDITABLES, TablaCompra
+
+COLS_GC = ["PRODUCTO", "ID_INSUMO", "Q_ESTIMACION", "PROVEEDOR", "PRECIO_HISTORICO", "UNIDAD",
+           "ENTRADAS: CANTIDAD INSUMOS", "MONTO_ESTIMADO", "PRECIO_MERCADO", "AJUSTE_MERMAS", "PRESUPUESTO",
+           "MONTO_REAL", "DIF"]
+
+
+def tabla(filas: int, rng) -> pd.DataFrame:
+    return pd.DataFrame({
+        "PRODUCTO": [f"INSUMO {i}" for i in range(filas)],
+        "ID_INSUMO": pd.array(rng.integers(1, 600, size=filas), dtype="Int64"),
+        "Q_ESTIMACION": rng.random(filas) * 50,
+        "PROVEEDOR": rng.choice(["LOS CABALLOS", "SELECTA", "SAN FERNANDO", "EL CHATO"], size=filas),
+        "PRECIO_HISTORICO": rng.random(filas) * 20,
+        "UNIDAD": "KG",
+        "ENTRADAS: CANTIDAD INSUMOS": rng.random(filas) * 50,
+        "PRECIO_MERCADO": rng.random(filas) * 20,
+        "AJUSTE_MERMAS": 0.05,
+    })
+
+
+def rerun_original(gc_input_df: pd.DataFrame, fila: int, valor: float) -> tuple:
+    # lo que hacía facturas.py en cada rerun (el editor devuelve la tabla con la celda cambiada)
+    df_gc = gc_input_df.copy()
+    df_gc["MONTO_ESTIMADO"] = df_gc["Q_ESTIMACION"] * df_gc["PRECIO_HISTORICO"]
+    df_gc["PRESUPUESTO"] = df_gc["MONTO_ESTIMADO"] * (1 + df_gc["AJUSTE_MERMAS"])
+    df_gc["MONTO_REAL"] = df_gc["ENTRADAS: CANTIDAD INSUMOS"] * df_gc["PRECIO_MERCADO"]
+    df_gc["DIF"] = df_gc["PRESUPUESTO"] - df_gc["MONTO_REAL"]
+    df_gc = df_gc[COLS_GC]
+    edited_gc = df_gc.copy()
+    edited_gc.iloc[fila, edited_gc.columns.get_loc("PRECIO_MERCADO")] = valor
+    gc_nuevo = edited_gc[[c for c in COLUMNAS_EDITABLES if c != "INCLUIR"]].copy()
+    entradas = edited_gc[["PRODUCTO", "PROVEEDOR", "Q_ESTIMACION", "ENTRADAS: CANTIDAD INSUMOS", "PRESUPUESTO",
+                          "MONTO_REAL", "DIF"]].copy()
+    return gc_nuevo, entradas, float(edited_gc["PRESUPUESTO"].sum())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=5000)
+    parser.add_argument("--ediciones", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = tabla(args.filas, rng)
+    filas = rng.integers(0, args.filas, size=args.ediciones)
+    valores = rng.random(args.ediciones) * 20
+
+    gc_input_df = base.copy()
+    t0 = time.perf_counter()
+    for fila, valor in zip(filas, valores):
+        gc_input_df, entradas, _ = rerun_original(gc_input_df, fila, valor)
+    t_original = (time.perf_counter() - t0) / args.ediciones
+
+    compra = TablaCompra(base)
+    compra.vista("editor", COLS_GC)
+    t_cambios = t_vista = 0.0
+    for fila, valor in zip(filas, valores):
+        t0 = time.perf_counter()
+        compra.aplicar_cambios("editor", {"edited_rows": {int(fila): {"PRECIO_MERCADO": float(valor)}}})
+        total = float(compra.frame["PRESUPUESTO"].sum())
+        t1 = time.perf_counter()
+        compra.vista("editor", COLS_GC)  # el frame que recibe st.data_editor
+        t_vista += time.perf_counter() - t1
+        t_cambios += t1 - t0
+    t_cambios /= args.ediciones
+    t_vista /= args.ediciones
+
+    # mismas derivadas al final
+    esperado = rerun_original(gc_input_df, 0, gc_input_df["PRECIO_MERCADO"].iloc[0])[1]
+    np.testing.assert_allclose(compra.frame["DIF"].to_numpy(), esperado["DIF"].to_numpy())
+    assert compra.frame[COLUMNAS_DERIVADAS].notna().all().all()
+
+    print(f"{args.filas:,} filas, {args.ediciones} ediciones de una celda")
+    print(f"original (rebuild + 2 copias) : {t_original * 1000:8.2f} ms por edición")
+    print(f"TablaCompra (change set)      : {t_cambios * 1000:8.2f} ms por edición (x{t_original / t_cambios:.1f})")
+    print(f"  + vista para el editor      : {t_vista * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_imagen.py
+# Uso: python -m benchmarks.bench_imagen [--facturas 6] [--carpeta fotos/] [--ocr]
+#   sin --carpeta genera fotos sintéticas de facturas (papel sobre mesa, 12 MP);
+#   --ocr (requiere API_KEY) extrae las descripciones con el modelo sobre el original y el preprocesado y las compara;
+#   el preprocesado se evalúa con los ahorros extra (detail="low", recorte a tiles) y termina con código 1 si
+#   alguna extracción difiere (es la validación pendiente para activar OCR_AHORRO_EXTRA=1)
+import argparse
+import base64
+import glob
+import os
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from armonic.imagen import lineas_texto, preparar_imagen, tokens_imagen
+
+PRODUCTOS = ["POLLO ENTERO", "PAPA AMARILLA", "CHORIZO PARRILLERO", "CHULETA DE CERDO", "ACEITE VEGETAL",
+             "ARROZ EXTRA", "CEBOLLA ROJA", "LIMON", "CARBON VEGETAL", "GASEOSA 500ML", "AJI AMARILLO", "SAL"]
+
+
+def foto_sintetica(n_lineas: int, tamanio_letra: int, semilla: int) -> tuple:
+    """Foto JPEG de una factura impresa sobre fondo oscuro, con ruido de cámara. Devuelve (bytes, líneas)."""
+    rng = np.random.default_rng(semilla)
+    papel = Image.new("L", (2480, 3508), 245)
+    dibujo = ImageDraw.Draw(papel)
+    fuente = ImageFont.load_default(size=tamanio_letra)
+    dibujo.text((150, 150), "DISTRIBUIDORA LOS CABALLOS SAC - RUC 20123456789", fill=20, font=fuente)
+    lineas = []
+    for i in range(n_lineas):
+        producto = PRODUCTOS[i % len(PRODUCTOS)]
+        cantidad, pu = int(rng.integers(1, 50)), float(rng.integers(100, 3000)) / 100
+        lineas.append(producto)
+        dibujo.text((150, 400 + i * tamanio_letra * 2), f"{cantidad:>4}  KG  {producto:<22} {pu:8.2f} {cantidad * pu:10.2f}", fill=20, font=fuente)
+    foto = Image.new("L", (3000, 4000), 60)
+    foto.paste(papel.resize((2300, 3250)), (350, 380))
+    ruido = rng.normal(0, 6, size=(4000, 3000))
+    foto = Image.fromarray(np.clip(np.asarray(foto, dtype=np.float64) + ruido, 0, 255).astype(np.uint8)).convert("RGB")
+    salida = BytesIO()
+    foto.save(salida, format="JPEG", quality=95)
+    return salida.getvalue(), lineas
+
+
+def descripciones_ocr(client, file_bytes: bytes, mime: str, detail: str) -> list:
+    url = f"data:{mime};base64,{base64.b64encode(file_bytes).decode('utf-8')}"
+    resp = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": [
+            {"type": "text", "text": "Lista SOLO las descripciones de los ítems de esta factura, una por línea, en mayúsculas."},
+            {"type": "image_url", "image_url": {"url": url, "detail": detail}},
+        ]}],
+        temperature=0,
+    )
+    return [l.strip(" -*") for l in (resp.choices[0].message.content or "").splitlines() if l.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--facturas", type=int, default=6)
+    parser.add_argument("--carpeta", default=None)
+    parser.add_argument("--ocr", action="store_true")
+    args = parser.parse_args()
+
+    if args.carpeta:
+        muestras = [(open(p, "rb").read(), None, os.path.basename(p))
+                    for p in sorted(glob.glob(os.path.join(args.carpeta, "*"))) if p.lower().endswith((".jpg", ".jpeg", ".png"))]
+    else:
+        # pocas líneas con letra grande (nota de pedido) y muchas con letra chica (factura larga)
+        muestras = []
+        for i in range(args.facturas):
+            n, letra = (8, 130) if i % 2 == 0 else (35, 40)
+            datos, lineas = foto_sintetica(n, letra, i)
+            muestras.append((datos, lineas, f"sintetica_{i}_{n}lineas.jpg"))
+
+    client = None
+    if args.ocr:
+        from armonic.llm import obtener_cliente
+        client = obtener_cliente()
+        if client is None:
+            parser.error("--ocr requiere API_KEY")
+
+    total_antes = total_despues = tokens_antes = tokens_despues = 0
+    comparadas = {"high": [0, 0], "low": [0, 0]}  # detail -> [iguales, total]
+    print(f"{'archivo':<28} {'KB antes':>9} {'KB después':>10} {'tokens':>13} {'detail':>6} {'ms':>6} {'líneas':>7}")
+    for datos, lineas, nombre in muestras:
+        t0 = time.perf_counter()
+        procesada, mime, detail = preparar_imagen(datos, ahorro_extra=True)
+        ms = (time.perf_counter() - t0) * 1000
+        original = Image.open(BytesIO(datos))
+        final = Image.open(BytesIO(procesada))
+        t_antes, t_despues = tokens_imagen(*original.size, "high"), tokens_imagen(*final.size, detail)
+        detectadas, _ = lineas_texto(np.asarray(final.convert("L")))
+        esperadas = "" if lineas is None else f"/{len(lineas) + 1}"  # ítems + encabezado
+        print(f"{nombre:<28} {len(datos) / 1024:9.0f} {len(procesada) / 1024:10.0f} {t_antes:>6}→{t_despues:<6} {detail:>6} {ms:6.0f} {detectadas:>4}{esperadas}")
+        total_antes += len(datos)
+        total_despues += len(procesada)
+        tokens_antes += t_antes
+        tokens_despues += t_despues
+        if client is not None:
+            t0 = time.perf_counter()
+            antes = descripciones_ocr(client, datos, f"image/{(original.format or 'jpeg').lower()}", "high")
+            t_ocr_antes = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            despues = descripciones_ocr(client, procesada, mime, detail)
+            t_ocr_despues = time.perf_counter() - t0
+            iguales = antes == despues
+            comparadas[detail][0] += iguales
+            comparadas[detail][1] += 1
+            print(f"  OCR {t_ocr_antes:.1f}s → {t_ocr_despues:.1f}s  {'mismas descripciones' if iguales else 'DIFIEREN'}")
+            if not iguales:
+                print(f"    original    : {antes}\n    preprocesada: {despues}")
+
+    print(f"\nbytes subidos : {total_antes / 1e6:.1f} MB → {total_despues / 1e6:.2f} MB (x{total_antes / max(total_despues, 1):.0f})")
+    print(f"tokens imagen : {tokens_antes} → {tokens_despues}")
+    if client is not None:
+        for detail, (iguales, total) in comparadas.items():
+            if total:
+                print(f"OCR detail={detail:<4}: {iguales}/{total} con las mismas descripciones que el original")
+        if any(iguales < total for iguales, total in comparadas.values()):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
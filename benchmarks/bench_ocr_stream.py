@@ -0,0 +1,98 @@
+# benchmarks/bench_ocr_stream.py
+# Uso: python -m benchmarks.bench_ocr_stream [--items 40] [--tokens-por-s 90] [--espera 1.5] [--ocr foto.jpg]
+#   sin --ocr simula el modelo (espera inicial + salida a N tokens/s) detrás de ClienteLLM;
+#   --ocr (requiere API_KEY) extrae los ítems de la imagen con gpt-4o-mini en stream.
+#   Compara el tiempo hasta la primera fila visible: respuesta completa + recorte del array vs. stream incremental.
+import argparse
+import base64
+import json
+import time
+from types import SimpleNamespace
+
+from armonic.json_incremental import LectorObjetosJSON
+from armonic.llm import ClienteLLM
+
+PRODUCTOS = ["POLLO ENTERO", "PAPA AMARILLA", "CHORIZO PARRILLERO", "CHULETA DE CERDO", "ACEITE VEGETAL",
+             "ARROZ EXTRA", "CEBOLLA ROJA", "LIMON", "CARBON VEGETAL", "GASEOSA 500ML", "AJI AMARILLO", "SAL"]
+
+
+class ModeloSimulado:
+    """Backend con la forma del SDK: espera inicial y luego el texto a `tokens_por_s` (~4 caracteres por token)."""
+
+    def __init__(self, texto: str, espera: float, tokens_por_s: float):
+        self.texto, self.espera, self.tokens_por_s = texto, espera, tokens_por_s
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _chunks(self):
+        time.sleep(self.espera)
+        for i in range(0, len(self.texto), 4):
+            time.sleep(1 / self.tokens_por_s)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.texto[i:i + 4]))])
+
+    def _create(self, model, messages, stream=False, **params):
+        if stream:
+            return self._chunks()
+        texto = "".join(c.choices[0].delta.content for c in self._chunks())
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=texto))])
+
+
+def mensajes(imagen: str = None) -> list:
+    contenido = [{"type": "text", "text": (
+        "Extrae el detalle de ítems de la factura. Devuelve SOLO un array JSON de objetos con "
+        "proveedor, descripcion, cantidad, pu, desc, importe, um."
+    )}]
+    if imagen:
+        url = f"data:image/jpeg;base64,{base64.b64encode(open(imagen, 'rb').read()).decode('utf-8')}"
+        contenido.append({"type": "image_url", "image_url": {"url": url, "detail": "high"}})
+    return [{"role": "user", "content": contenido}]
+
+
+def completa(client, msgs) -> tuple:
+    # comportamiento anterior: esperar toda la respuesta y recortar el array con find/rfind
+    t0 = time.perf_counter()
+    contenido = client.chat.completions.create(model="gpt-4o-mini", messages=msgs, temperature=0).choices[0].message.content or "[]"
+    raw = contenido[contenido.find("["):contenido.rfind("]") + 1]
+    filas = json.loads(raw)
+    t = time.perf_counter() - t0
+    return t, t, len(filas)
+
+
+def en_stream(client, msgs) -> tuple:
+    t0 = time.perf_counter()
+    primera, filas, lector = None, 0, LectorObjetosJSON()
+    for chunk in client.chat.completions.create(model="gpt-4o-mini", messages=msgs, temperature=0, stream=True):
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        nuevas = lector.alimentar(delta or "")
+        if nuevas and primera is None:
+            primera = time.perf_counter() - t0
+        filas += len(nuevas)
+    return primera, time.perf_counter() - t0, filas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--tokens-por-s", type=float, default=90.0)
+    parser.add_argument("--espera", type=float, default=1.5)
+    parser.add_argument("--ocr", default=None)
+    args = parser.parse_args()
+
+    if args.ocr:
+        from armonic.llm import obtener_cliente
+        client = obtener_cliente()
+    else:
+        items = [{"proveedor": "DISTRIBUIDORA LOS CABALLOS SAC", "descripcion": PRODUCTOS[i % len(PRODUCTOS)],
+                  "cantidad": i % 9 + 1, "pu": 4.5, "desc": 0, "importe": (i % 9 + 1) * 4.5, "um": "kg"}
+                 for i in range(args.items)]
+        texto = "```json\n" + json.dumps(items, ensure_ascii=False, indent=2) + "\n```"
+        client = ClienteLLM(ModeloSimulado(texto, args.espera, args.tokens_por_s))
+    msgs = mensajes(args.ocr)
+
+    print(f"{'modo':<10} {'1ª fila (s)':>12} {'total (s)':>10} {'filas':>6}")
+    for nombre, fn in [("completa", completa), ("stream", en_stream)]:
+        primera, total, filas = fn(client, msgs)
+        print(f"{nombre:<10} {primera:12.2f} {total:10.2f} {filas:6d}")
+
+
+if __name__ == "__main__":
+    main()
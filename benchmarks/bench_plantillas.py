@@ -0,0 +1,160 @@
+# benchmarks/bench_plantillas.py
+# Uso: python -m benchmarks.bench_plantillas [--facturas 300] [--recurrentes 0.8]
+#   facturas PDF con texto de 5 proveedores recurrentes (cada uno con su formato) y de proveedores ocasionales;
+#   se procesan en orden como en Facturación: plantilla si hay, si no "modelo de visión" (las filas reales),
+#   y cada detalle confirmado enseña la plantilla. Mide % de facturas sin LLM, exactitud y ms por factura.
+#   Al final cada proveedor recurrente cambia de formato (toda la factura, o una sola línea en facturas sin
+#   totales): la plantilla debe ceder al modelo de visión.
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from armonic.cache_disco import CacheDisco
+from armonic.plantillas import COLUMNAS, PlantillasProveedor, texto_pdf
+
+PRODUCTOS = ["POLLO ENTERO", "PAPA AMARILLA", "CHORIZO PARRILLERO", "CHULETA DE CERDO", "ACEITE PRIMOR 1LT",
+             "ARROZ EXTRA", "CEBOLLA ROJA", "LIMON", "CARBON VEGETAL", "GASEOSA 500ML", "AJI AMARILLO", "SAL"]
+
+# formato de línea de cada proveedor recurrente: (cantidad, descripción, precio, unidad)
+FORMATOS = {
+    "DISTRIBUIDORA SELECTA EIRL": lambda c, d, p, u: f"{c} {d} {p:.2f} UND {c * p:,.2f}",
+    "AVICOLA SAN FERNANDO SAC": lambda c, d, p, u: f"{d} {c:.2f} {u.upper()} S/ {p:.2f} S/ {c * p:.2f}",
+    "CARNES EL CHATO SAC": lambda c, d, p, u: f"{c} BOLSA {d} {c * 1.6:.2f}{u}",
+    "MERCADO MAYORISTA EIRL": lambda c, d, p, u: f"{c:03d} {u.upper()} {d} {p:,.2f} 0.00 {c * p:,.2f}",
+    "LOS CABALLOS SAC": lambda c, d, p, u: f"{c} | {d} | {p:.2f} | {c * p:.2f}",
+}
+
+
+def pdf_texto(lineas: list) -> bytes:
+    """PDF mínimo de una página con una línea de texto por elemento (Helvetica)."""
+    ops = ["BT /F1 10 Tf 40 800 Td 12 TL"]
+    for l in lineas:
+        ops.append("(" + l.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*")
+    stream = "\n".join(ops + ["ET"]).encode("latin-1")
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    salida, offsets = b"%PDF-1.4\n", []
+    for i, obj in enumerate(objetos, start=1):
+        offsets.append(len(salida))
+        salida += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    salida += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    return salida + b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+
+
+def factura(proveedor: str, ruc: str, formato, rng, totales: bool = True, otro_formato=None) -> tuple:
+    """(bytes del PDF, detalle real) de una factura con 3 a 12 ítems; con `otro_formato`, su primera línea usa ese formato."""
+    n = int(rng.integers(3, len(PRODUCTOS) + 1))
+    filas = []
+    lineas = [proveedor, f"RUC {ruc}", f"FACTURA ELECTRONICA F001-{int(rng.integers(1, 99999)):05d}",
+              "ADQUIRIENTE: ARMONIC SAC RUC 20555555555", "CANT. DESCRIPCION P.UNIT IMPORTE"]
+    for i in rng.choice(len(PRODUCTOS), size=n, replace=False):
+        c, p, u = int(rng.integers(1, 60)), float(rng.integers(50, 9000)) / 100, "kg"
+        lineas.append((otro_formato if otro_formato and not filas else formato)(c, PRODUCTOS[i], p, u))
+        filas.append({"proveedor": proveedor, "descripcion": PRODUCTOS[i], "cantidad": float(c), "pu": p,
+                      "desc": 0.0, "importe": c * p, "um": u})
+    if "BOLSA" in lineas[-1]:
+        # carnicería: cantidad de bolsas y kilos a la derecha, sin precio
+        for f in filas:
+            f["pu"], f["importe"] = 0.0, round(f["cantidad"] * 1.6, 2)
+    gravada = sum(f["cantidad"] * f["pu"] for f in filas) or 1000.0
+    if totales:
+        lineas += [f"OP. GRAVADA S/ {gravada:,.2f}", f"IGV 18% S/ {gravada * 0.18:,.2f}", f"TOTAL S/ {gravada * 1.18:,.2f}"]
+    return pdf_texto(lineas), pd.DataFrame(filas, columns=COLUMNAS)
+
+
+def exacta(items: pd.DataFrame, real: pd.DataFrame) -> bool:
+    # todas las columnas del detalle confirmado
+    return bool(
+        len(items) == len(real)
+        and all((items[c].str.upper() == real[c].str.upper()).all() for c in ["proveedor", "descripcion", "um"])
+        and np.allclose(items[["cantidad", "pu", "desc", "importe"]], real[["cantidad", "pu", "desc", "importe"]])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--facturas", type=int, default=300)
+    parser.add_argument("--recurrentes", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    recurrentes = [(p, f"20{600000001 + i:09d}", f) for i, (p, f) in enumerate(FORMATOS.items())]
+    muestras = []
+    for i in range(args.facturas):
+        if rng.random() < args.recurrentes:
+            proveedor, ruc, formato = recurrentes[int(rng.integers(len(recurrentes)))]
+        else:
+            # ocasional: RUC propio y formato de uno de los conocidos
+            proveedor, ruc, formato = f"PROVEEDOR OCASIONAL {i} SAC", f"10{int(rng.integers(10**8, 10**9)):09d}", recurrentes[i % 5][2]
+        muestras.append(factura(proveedor, ruc, formato, rng))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plantillas = PlantillasProveedor(CacheDisco(os.path.join(tmp, "plantillas.sqlite"), max_entradas=5000))
+        locales = correctas = llamadas = 0
+        t_local = 0.0
+        for datos, real in muestras:
+            t0 = time.perf_counter()
+            items = plantillas.extraer(texto_pdf(datos))
+            t_local += time.perf_counter() - t0
+            if items is None:
+                llamadas += 1  # modelo de visión; el usuario confirma el detalle real
+            else:
+                locales += 1
+                correctas += exacta(items, real)
+            plantillas.aprender(texto_pdf(datos), real)
+
+        # proveedor que cambia de formato: ninguna fila de la plantilla vieja se acepta
+        formatos = list(FORMATOS.values())
+        cambios = aceptadas = 0
+        for k, (proveedor, ruc, formato) in enumerate(recurrentes):
+            for otro in formatos:
+                if otro is formato:
+                    continue
+                datos, real = factura(proveedor, ruc, otro, rng)
+                items = plantillas.extraer(texto_pdf(datos))
+                cambios += 1
+                aceptadas += items is not None and not exacta(items, real)
+
+        # confirmar dos veces la misma factura de un proveedor nuevo no habilita su plantilla
+        datos, real = factura("PROVEEDOR NUEVO SAC", "20699999999", formatos[0], rng)
+        plantillas.aprender(texto_pdf(datos), real)
+        plantillas.aprender(texto_pdf(datos), real)
+        repetida = plantillas.extraer(texto_pdf(datos)) is not None
+
+        # facturas sin totales (nada que cuadrar): una sola línea con otra forma tampoco se acepta
+        for k, formato in enumerate(formatos):
+            ruc = f"20{610000001 + k:09d}"
+            for _ in range(2):
+                datos, real = factura(f"SIN TOTALES {k} SAC", ruc, formato, rng, totales=False)
+                plantillas.aprender(texto_pdf(datos), real)
+            for otro in formatos:
+                if otro is formato:
+                    continue
+                datos, real = factura(f"SIN TOTALES {k} SAC", ruc, formato, rng, totales=False, otro_formato=otro)
+                items = plantillas.extraer(texto_pdf(datos))
+                cambios += 1
+                aceptadas += items is not None and not exacta(items, real)
+
+    print(f"{args.facturas} facturas PDF, {args.recurrentes:.0%} de {len(recurrentes)} proveedores recurrentes")
+    print(f"leídas con plantilla : {locales:5d} ({locales / args.facturas:.0%}), exactas {correctas}/{locales}")
+    print(f"modelo de visión     : {llamadas:5d} llamadas (antes: {args.facturas})")
+    print(f"texto + plantilla    : {t_local / args.facturas * 1000:8.2f} ms por factura (sin red)")
+    print(f"cambio de formato    : {aceptadas}/{cambios} detalles erróneos aceptados")
+    assert correctas == locales, "una plantilla devolvió un detalle distinto al confirmado"
+    assert aceptadas == 0, "una plantilla aceptó un formato distinto al aprendido"
+    assert not repetida, "la misma factura confirmada dos veces habilitó la plantilla"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_proporciones.py
+# Uso: python -m benchmarks.bench_proporciones [--replicas 50]
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from armonic.proporciones import calcular_proporciones
+
+PATH_HISTORICO = os.path.join("data", "historico_de_ventas_corrected.csv")
+
+
+def proporciones_loop(df):
+    # implementación original de pages/demanda.py::actualizar_gestion_productos
+    proportions_list = []
+    total_dias = len(df["day"].unique())
+    for idx, group in df.groupby(by=["name"]):
+        (name_id, ) = idx
+        apariciones_diarias = len(group["day"].unique())
+        cantidad_tota_de_apariciones = group["cantidad"].sum()
+        id_product = group["id"].iloc[0]
+        proportions_list.append({"id":id_product, "name":name_id,"p": apariciones_diarias/total_dias, "q":cantidad_tota_de_apariciones/apariciones_diarias})
+    return pd.DataFrame(proportions_list)
+
+
+def cargar(replicas, sucursales=1):
+    df = pd.read_csv(PATH_HISTORICO).rename(columns={
+        "fecha":"date",
+        "item_nombre":"name",
+        "codunicopedido":"id_order",
+        "codigo_producto":"id"
+    })
+    df["date"] = pd.to_datetime(df["date"])
+    # replicar el histórico hacia atrás para simular varios años / sucursales
+    span = df["date"].max().normalize() - df["date"].min().normalize() + pd.Timedelta(days=1)
+    partes = []
+    for i in range(replicas):
+        parte = df.copy()
+        parte["date"] = parte["date"] - i * span
+        if i % sucursales:
+            parte["name"] = parte["name"] + f" (SUC {i % sucursales + 1})"
+        partes.append(parte)
+    df = pd.concat(partes, ignore_index=True)
+    df["day"] = df["date"].dt.floor("D")
+    return df
+
+
+def medir(fn, df, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        out = fn(df)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return out, mejor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replicas", type=int, default=20)
+    parser.add_argument("--sucursales", type=int, default=10)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    df = cargar(args.replicas, args.sucursales)
+    print(f"filas: {len(df):,} | productos: {df['name'].nunique():,} | días: {df['day'].nunique():,}")
+
+    esperado, t_loop = medir(proporciones_loop, df, args.repeticiones)
+    obtenido, t_vec = medir(calcular_proporciones, df, args.repeticiones)
+
+    pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+    print(f"loop groupby : {t_loop * 1000:9.1f} ms")
+    print(f"vectorizado  : {t_vec * 1000:9.1f} ms  (x{t_loop / t_vec:.1f})")
+    print("OK: mismo resultado")
+
+
+if __name__ == "__main__":
+    main()
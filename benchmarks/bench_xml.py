@@ -0,0 +1,147 @@
+# benchmarks/bench_xml.py
+# Uso: python -m benchmarks.bench_xml [--facturas 5000] [--lineas 15]
+#   genera un ZIP de facturas UBL y compara el parser original (fromstring + búsquedas ".//")
+#   contra armonic/xml_ubl.py (iterparse + XPath precompilados) en facturas/s y pico de memoria;
+#   "detalle" es lo que hace Facturación: streaming, pero guarda el lote completo (texto en strings de Arrow)
+import argparse
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import pandas as pd
+from lxml import etree
+
+CABECERA = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"'
+    ' xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"'
+    ' xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">'
+    "<cbc:ID>F001-{n}</cbc:ID>"
+    "<cac:AccountingSupplierParty><cac:Party><cac:PartyLegalEntity>"
+    "<cbc:RegistrationName>PROVEEDOR {p} SAC</cbc:RegistrationName>"
+    "</cac:PartyLegalEntity></cac:Party></cac:AccountingSupplierParty>"
+)
+LINEA = (
+    "<cac:InvoiceLine><cbc:ID>{i}</cbc:ID>"
+    '<cbc:InvoicedQuantity unitCode="KGM">{q}</cbc:InvoicedQuantity>'
+    '<cbc:LineExtensionAmount currencyID="PEN">{t:.2f}</cbc:LineExtensionAmount>'
+    "<cac:AllowanceCharge><cbc:ChargeIndicator>false</cbc:ChargeIndicator><cbc:Amount>0.00</cbc:Amount></cac:AllowanceCharge>"
+    "<cac:Item><cbc:Description>INSUMO {i} DE PRUEBA</cbc:Description></cac:Item>"
+    '<cac:Price><cbc:PriceAmount currencyID="PEN">{pu:.2f}</cbc:PriceAmount></cac:Price>'
+    "</cac:InvoiceLine>"
+)
+
+
+def generar_zip(path, facturas, lineas):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        for n in range(facturas):
+            cuerpo = "".join(LINEA.format(i=i, q=i + 1, pu=2.5, t=(i + 1) * 2.5) for i in range(lineas))
+            z.writestr(f"F001-{n:06d}.xml", CABECERA.format(n=n, p=n % 40) + cuerpo + "</Invoice>")
+
+
+def coerce_float(x):
+    if x in (None, "", " "):
+        return 0.0
+    if isinstance(x, (int, float)):
+        return float(x)
+    s = str(x).replace(",", ".")
+    s = re.sub(r"[^\d.\-]", "", s)
+    try:
+        return float(s)
+    except Exception:
+        return 0.0
+
+
+def clean_str(s):
+    return re.sub(r"\s{2,}", " ", str(s or "").upper()).strip()
+
+
+def parse_original(xml_bytes):
+    # implementación original de pages/facturas.py::parse_invoice_xml
+    root = etree.fromstring(xml_bytes, parser=etree.XMLParser(recover=True, huge_tree=True))
+    ns = root.nsmap
+    rows = []
+    for line in root.findall(".//cac:InvoiceLine", namespaces=ns):
+        desc = line.findtext(".//cbc:Description", namespaces=ns) or line.findtext(".//cac:Item/cbc:Description", namespaces=ns) or ""
+        qty_el = line.find(".//cbc:InvoicedQuantity", namespaces=ns)
+        price_el = line.find(".//cac:Price/cbc:PriceAmount", namespaces=ns)
+        line_total_el = line.find(".//cbc:LineExtensionAmount", namespaces=ns)
+        disc_el = line.find(".//cac:AllowanceCharge/cbc:Amount", namespaces=ns)
+        rows.append({
+            "proveedor": "",
+            "descripcion": clean_str(desc),
+            "cantidad": coerce_float(qty_el.text if qty_el is not None else "0"),
+            "pu": coerce_float(price_el.text if price_el is not None else "0"),
+            "desc": coerce_float(disc_el.text if disc_el is not None else "0"),
+            "importe": coerce_float(line_total_el.text if line_total_el is not None else "0"),
+            "um": ((qty_el.get("unitCode") if qty_el is not None else "") or "").lower(),
+        })
+    return pd.DataFrame(rows, columns=["proveedor", "descripcion", "cantidad", "pu", "desc", "importe", "um"])
+
+
+def correr_modo(modo, path_zip):
+    # subproceso por modo para medir el pico de memoria por separado
+    from armonic.xml_ubl import iterar_lote
+
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    filas = 0
+    with zipfile.ZipFile(path_zip) as z:
+        facturas = sum(1 for n in z.namelist() if n.endswith(".xml"))
+    if modo == "original":
+        # flujo original: cada XML completo en memoria y un DataFrame por factura
+        partes = []
+        with zipfile.ZipFile(path_zip) as z:
+            for nombre in sorted(z.namelist()):
+                partes.append(parse_original(z.read(nombre)))
+        filas = len(pd.concat(partes, ignore_index=True))
+    elif modo == "detalle":
+        texto = {col: "string[pyarrow]" for col in ["proveedor", "descripcion", "um", "archivo"]}
+        filas = len(pd.concat([chunk.astype(texto) for chunk in iterar_lote(path_zip)], ignore_index=True))
+    else:
+        for chunk in iterar_lote(path_zip):
+            filas += len(chunk)
+    dt = time.perf_counter() - t0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+    print(f"{modo:9s} {dt:8.2f} s  {facturas / dt:10,.0f} facturas/s  {pico / 1024:8.0f} MB  ({filas:,} filas)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--facturas", type=int, default=5000)
+    parser.add_argument("--lineas", type=int, default=15)
+    parser.add_argument("--modo", default=None)
+    parser.add_argument("--zip", default=None)
+    args = parser.parse_args()
+
+    if args.modo:
+        correr_modo(args.modo, args.zip)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path_zip = os.path.join(tmp, "facturas.zip")
+        generar_zip(path_zip, args.facturas, args.lineas)
+
+        from armonic.xml_ubl import iterar_lote
+        with zipfile.ZipFile(path_zip) as z:
+            muestra = sorted(z.namelist())[:50]
+            esperado = pd.concat([parse_original(z.read(n)) for n in muestra], ignore_index=True)
+        obtenido = next(iterar_lote(path_zip)).head(len(esperado))
+        columnas = ["descripcion", "cantidad", "pu", "desc", "importe", "um"]
+        pd.testing.assert_frame_equal(obtenido[columnas].reset_index(drop=True), esperado[columnas])
+        assert obtenido["proveedor"].str.startswith("PROVEEDOR").all()
+
+        print(f"ZIP: {os.path.getsize(path_zip) / 2**20:.1f} MB, {args.facturas:,} facturas x {args.lineas} líneas")
+        print(f"{'modo':9s} {'tiempo':>10s} {'throughput':>21s} {'pico RSS':>11s}")
+        for modo in ["original", "streaming", "detalle"]:
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_xml", "--modo", modo, "--zip", path_zip], check=True)
+        print("OK: mismas filas (y proveedor desde AccountingSupplierParty)")
+
+
+if __name__ == "__main__":
+    main()
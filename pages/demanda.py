@@ -6,14 +6,26 @@ import altair as alt
 import gc
 from io import StringIO
 from dotenv import load_dotenv
-from openai import OpenAI
 import os, json
 from datetime import datetime
 import streamlit.components.v1 as components
+from armonic.proporciones import calcular_proporciones
+from armonic.cache_historico import convertir_historico, leer_csv_ventas, leer_historico, rango_fechas
+from armonic.ingesta import HistoricoIncremental
+from armonic.asignacion import asignar_lote
+from armonic.pronostico import DIAS_AJUSTE, PronosticoEstacional
+from armonic.demanda_diaria import MatrizDemanda
+from armonic.cache_llm import cache_insights, chat_cacheado
+from armonic.llm import obtener_cliente
+from armonic.insights_bg import clave_tarea, pedir_insight
+from armonic.prompt_compacto import compactar_tabla
+from armonic.recetas import RequerimientoIncremental, cargar_matriz
 
 load_dotenv()
-API_KEY = os.getenv("API_KEY")
-client = OpenAI(api_key=API_KEY)
+# cliente compartido por proceso (pool, límite de concurrencia, reintentos); None sin API_KEY
+client = obtener_cliente()
+# cache en disco compartido por todas las sesiones: misma tabla => mismo insight, sin llamar al modelo
+insights_cache = cache_insights()
 
 # st.session_state
 
@@ -29,19 +41,8 @@ def set_params_demanda():
     
     if "load_data" not in st.session_state:
         st.session_state["load_data"] = False
-    if "historical_data" not in st.session_state:
-        st.session_state["historical_data"] = pd.DataFrame({
-            "date":[],
-            "name":[],
-            "id_order":[],
-            "id":[],
-            "cantidad":[],
-            "day":[]
-        })
-
     if "upload_historical_data" not in st.session_state:
         st.session_state["upload_historical_data"] = False
-    # date, name, id_order, id, cantidad, day, historical_data
     if "historico_ordenes" not in st.session_state:
         st.session_state["historico_ordenes"] = pd.DataFrame({
             "fecha": [],
@@ -68,16 +69,6 @@ def set_params_demanda():
             "Total": []
         })
 
-    if "forecast" not in st.session_state:
-        info_forecast = {}
-        with open("data/predict14.json", "r") as f:
-            info_forecast[14] = json.load(f)
-        with open("data/predict30.json", "r") as f:
-            info_forecast[30] = json.load(f)
-        with open("data/predict90.json", "r") as f:
-            info_forecast[90] = json.load(f)
-        st.session_state["forecast"] = info_forecast
-    
     if "metadata" not in st.session_state:
         with open("data/metadata.json", "r") as f:
             metadata = json.load(f)
@@ -89,9 +80,11 @@ def set_params_demanda():
 PATH_DIR_DATA = os.path.join("data")
 
 @st.cache_data
-def cargar_series_de_tiempo():
-    set_params_demanda()
-    return st.session_state["historical_data"]
+def cargar_proporciones(path_cache):
+    # cacheado por ruta (= hash del contenido): otra sesión con el mismo archivo no relee el histórico
+    df = leer_historico(path_cache, columnas=["date", "name", "id", "cantidad"])
+    df["day"] = df["date"].dt.floor("D")
+    return calcular_proporciones(df)
 
 @st.cache_data
 def cargar_receta():
@@ -108,155 +101,158 @@ def cargar_insights():
         
 #=======================================================================================================
 
-def allocate_to_target(df_products, forecast_orders, avg_items_per_order, buffer_quantile=0.0):
-    df = df_products.copy()
-    # 1) target total units
-    T = int(round(forecast_orders * avg_items_per_order * (1.0 + buffer_quantile)))
-    if T <= 0:
-        df['alloc'] = 0
-        return df
-
-    # 2) If all E are zero, fallback to proportional by historical counts or equal split
-    if df['E'].sum() == 0:
-        # fallback: proportional to historical counts field if present, else equal
-        if 'historical_count' in df.columns and df['historical_count'].sum() > 0:
-            df['E'] = df['historical_count'] / df['historical_count'].sum() * T
-        else:
-            df['E'] = 1.0 / len(df) * T
-
-    # 3) Scale expectations so they sum to T
-    sumE = df['E'].sum()
-    df['scaled'] = df['E'] / sumE * T
-
-    # 4) Largest Remainder (Hamilton) rounding to integers summing to T
-    df['floor'] = np.floor(df['scaled']).astype(int)
-    remainder = T - df['floor'].sum()
-    # fractional parts sorted desc
-    df['frac'] = df['scaled'] - df['floor']
-    df = df.sort_values('frac', ascending=False).reset_index(drop=True)
-    df['alloc'] = df['floor'].copy()
-    if remainder > 0:
-        df.loc[0:remainder-1, 'alloc'] += 1
-
-    # 6) Final sanitizing: ensure non-negative int and sum equals (approx) T
-    df['alloc'] = df['alloc'].clip(lower=0).astype(int)
-    final_sum = df['alloc'].sum()
-    # final adjustment: if sum differs, distribute the difference by frac desc/asc
-    diff = T - final_sum
-    if diff > 0:
-        # add 1 to top-diff items by frac (or any priority)
-        idxs = df.sort_values('frac', ascending=False).index[:diff]
-        df.loc[idxs, 'alloc'] += 1
-    elif diff < 0:
-        diff = -diff
-        idxs = df.sort_values('frac', ascending=True).index[:diff]
-        df.loc[idxs, 'alloc'] = (df.loc[idxs, 'alloc'] - 1).clip(lower=0)
-
-    # restore original order
-    return df.sort_index()
-
-def actualizar_gestion_productos(df):
-
-    proportions_list = []
-    total_dias = len(df["day"].unique())
-    # total_dias 
-    for idx, group in df.groupby(by=["name"]):
-        (name_id, ) = idx
-        apariciones_diarias = len(group["day"].unique())
-        cantidad_tota_de_apariciones = group["cantidad"].sum()
-        id_product = group["id"].iloc[0]
-        proportions_list.append({"id":id_product, "name":name_id,"p": apariciones_diarias/total_dias, "q":cantidad_tota_de_apariciones/apariciones_diarias})
-
-    proporciones = pd.DataFrame(proportions_list)
-    
-    time_dict = {"14 días":14, "1 mes":30, "3 meses":90}
-    forecast_data = st.session_state["forecast"]
-    window = st.session_state["forecast_time_selector"]
-    predict = forecast_data[time_dict[window]]
-    orders_day = pd.Series(predict["prediccion"])
-    
-    metadata = st.session_state["metadata"]
-    historical_daily_orders = metadata["historical_daily_orders"]
-    # total_orders = metadata["total_orders"]
-    avg_items_per_order = metadata["avg_items_per_order"]
-
-
-    scale_factor = orders_day/historical_daily_orders
-    total_scale = scale_factor.sum()
-    tmp = proporciones.copy()
-    tmp["E"] = tmp["p"] * tmp["q"] * total_scale
+VENTANAS = {"14 días":14, "1 mes":30, "3 meses":90}
+# días de histórico que acompañan al pronóstico en el gráfico de cada ventana
+DIAS_HISTORICO_VENTANA = {14: 30, 30: 60, 90: 90}
 
-    total_forecast_orders = np.sum(predict["prediccion"])
-    
-    products_allocaton = allocate_to_target(tmp, total_forecast_orders, avg_items_per_order)
-    # products_allocaton.columns
-    main_cols = ["id", "name", "alloc"]
-    tmp = products_allocaton[main_cols]
+def construir_gestion_productos(proporciones, alloc):
+    main_cols = ["id", "name"]
+    tmp = proporciones[main_cols].copy()
+    tmp["alloc"] = alloc
     tmp = tmp.rename(columns={   
         "name": "Nombre",
         "alloc": "Estimacion"
     })
     tmp.loc[:,"Ajuste de negocio(%)"] = 0
     tmp.loc[:,"Total"] = tmp.loc[:, "Estimacion"]*(1+tmp.loc[:,"Ajuste de negocio(%)"])
-    
-    st.session_state["gestion_productos"] = tmp
-
-def actualizar_prediccion():    
-    time_dict = {"14 días":14, "1 mes":30, "3 meses":90}
-    forecast_data = st.session_state["forecast"]
-    window = st.session_state["forecast_time_selector"]
-    predict = forecast_data[time_dict[window]]
+    return tmp
 
+def construir_prediccion(predict):
     forecast = pd.DataFrame(predict)
     forecast = forecast.rename(columns={"fechas":"fecha"})
     forecast["fecha"] = pd.to_datetime(forecast["fecha"])
+    return forecast
 
-    st.session_state["forecast_data"] = forecast
+def recortar_historico(historico_ordenes, dias):
+    tmp = historico_ordenes.sort_values(by=["fecha"]).copy()
+    tmp["fecha"] = pd.to_datetime(tmp["fecha"])
+    return tmp.iloc[-(dias + DIAS_HISTORICO_VENTANA[dias]):]
+
+@st.cache_data(max_entries=16)
+def precalcular_ventanas(dataset_hash, _proporciones, _historico_ordenes, _forecast, _metadata):
+    # las 3 ventanas en una sola pasada, cacheadas por hash del dataset (los args con _ no se hashean)
+    # historical_daily_orders = _metadata["historical_daily_orders"]
+    # total_orders = _metadata["total_orders"]
+    avg_items_per_order = _metadata["avg_items_per_order"]
+
+    # E = p * q * sum(prediccion / historical_daily_orders): el factor de escala es el mismo para
+    # todos los productos y no cambia el reparto, así que las 3 ventanas comparten E y solo
+    # difiere el total de unidades => un solo asignar_lote con 3 objetivos
+    E = (_proporciones["p"] * _proporciones["q"]).to_numpy()
+    targets = [
+        int(round(np.sum(_forecast[dias]["prediccion"]) * avg_items_per_order))
+        for dias in VENTANAS.values()
+    ]
+    asignaciones = asignar_lote(E, targets)
+
+    ventanas = {}
+    for (label, dias), alloc in zip(VENTANAS.items(), asignaciones):
+        predict = _forecast[dias]
+        ventanas[label] = {
+            "gestion_productos": construir_gestion_productos(_proporciones, alloc),
+            "forecast_data": construir_prediccion(predict),
+            "graph_orders": recortar_historico(_historico_ordenes, dias),
+        }
+    return ventanas
+
+@st.cache_data(max_entries=16)
+def calcular_demanda_diaria(dataset_hash, _proporciones, _forecast, _metadata):
+    # producto x día para el horizonte más largo; las ventanas cortas son sus primeros días
+    # (el límite de tendencia de PronosticoEstacional no depende del horizonte pedido)
+    horizonte = max(VENTANAS.values())
+    return MatrizDemanda.desde_pronostico(_proporciones, _forecast[horizonte], _metadata["avg_items_per_order"])
+
+@st.cache_data(max_entries=16)
+def ajustar_pronostico(dataset_hash, _historico_ordenes):
+    # el modelo se ajusta una vez por dataset; predecir cualquier horizonte toma milisegundos
+    return PronosticoEstacional(horizonte_referencia=max(VENTANAS.values())).ajustar(
+        _historico_ordenes["fecha"], _historico_ordenes["ordenes diarias"]
+    )
+
+def actualizar_ventanas():
+    # se llama solo cuando cambian los datos; cambiar de ventana después es una búsqueda
+    ingesta = st.session_state.get("ingesta")
+    marca = ingesta.ultima_fecha if ingesta is not None else ""
+    dataset_hash = f'{st.session_state["historico_path"]}|{marca}'
+    modelo = ajustar_pronostico(dataset_hash, st.session_state["historico_ordenes"])
+    st.session_state["forecast"] = {dias: modelo.predecir(dias) for dias in VENTANAS.values()}
+    st.session_state["ventanas"] = precalcular_ventanas(
+        dataset_hash,
+        st.session_state["proporciones"],
+        st.session_state["historico_ordenes"],
+        st.session_state["forecast"],
+        st.session_state["metadata"],
+    )
+    st.session_state["demanda_diaria"] = calcular_demanda_diaria(
+        dataset_hash,
+        st.session_state["proporciones"],
+        st.session_state["forecast"],
+        st.session_state["metadata"],
+    )
+    aplicar_ventana()
+
+def aplicar_ventana():
+    window = st.session_state["forecast_time_selector"]
+    if window is None or "ventanas" not in st.session_state:
+        return
+    ventana = st.session_state["ventanas"][window]
+    st.session_state["gestion_productos"] = ventana["gestion_productos"]
+    st.session_state["forecast_data"] = ventana["forecast_data"]
+    st.session_state["graph_orders"] = ventana["graph_orders"]
     
-def actualizar_historico_ordenes(df):
-    tmp = df.copy()
+# días de órdenes diarias que se leen: el gráfico muestra hasta 90 de pronóstico + 90 de histórico
+# y el pronóstico se ajusta con los últimos DIAS_AJUSTE
+DIAS_HISTORICO_ORDENES = max(180, DIAS_AJUSTE)
+
+def actualizar_historico_ordenes(path_cache):
+    # solo `date` y `cantidad` de los últimos días: el filtro se resuelve en el Parquet
+    _, fecha_max = rango_fechas(path_cache)
+    desde = fecha_max.floor("D") - pd.Timedelta(days=DIAS_HISTORICO_ORDENES)
+    tmp = leer_historico(path_cache, columnas=["date", "cantidad"], desde=desde)
     tmp.loc[:,"fecha_diaria"] = tmp["date"].dt.floor("D")
     tmp = tmp.groupby(by=["fecha_diaria"]).agg({"cantidad":"sum"}).reset_index()
     tmp = tmp.rename(columns={"fecha_diaria":"fecha", "cantidad":"ordenes diarias"})
     st.session_state["historico_ordenes"] = tmp
     
-def cargar_historico_ventas(df):
-    # df = pd.read_csv(path_data, low_memory=False)
-    df = df.rename(columns={
-        "fecha":"date",
-        "item_nombre":"name",
-        "codunicopedido":"id_order",
-        "codigo_producto":"id"
-    })
-    # fecha,item_nombre,codunicopedido,codigo_producto,cantidad,day
-    # date, name, id_order, id, cantidad, day, historical_data
-    # df["name"].value_counts()
-    df["date"] = pd.to_datetime(df["date"])
-    df["day"] = df["date"].dt.floor("D")
-    st.session_state["historical_data"] = df
-    window = st.session_state["forecast_time_selector"]
-    if window != None:
-        actualizar_historico_ordenes(df)
-        actualizar_gestion_productos(df)
-        actualizar_prediccion()
+def ruta_ingesta(path_cache):
+    # estado incremental (ventas agregadas después del histórico base), junto a su Parquet
+    return path_cache.replace(".parquet", "_ingesta.pkl")
+
+def cargar_historico_ventas(path_cache):
+    # path_cache: Parquet generado por convertir_historico (columnas ya renombradas y fechas parseadas)
+    # date, name, id_order, id, cantidad
+    st.session_state["historico_path"] = path_cache
+    # si ya se agregaron ventas nuevas sobre este histórico, se parte de esos contadores
+    ingesta = HistoricoIncremental.cargar(ruta_ingesta(path_cache))
+    st.session_state["ingesta"] = ingesta
+    if ingesta is not None:
+        actualizar_desde_ingesta(ingesta)
+        return
+    # p y q no dependen de la ventana: se calculan una sola vez por archivo
+    st.session_state["proporciones"] = cargar_proporciones(path_cache)
+    actualizar_historico_ordenes(path_cache)
+    actualizar_ventanas()
+
+def actualizar_desde_ingesta(ingesta):
+    # proporciones y órdenes diarias salen de los contadores: no se relee el histórico
+    st.session_state["proporciones"] = ingesta.proporciones()
+    st.session_state["historico_ordenes"] = ingesta.historico_ordenes()
+    actualizar_ventanas()
+
+def agregar_ventas_nuevas(file_bytes):
+    path_cache = st.session_state["historico_path"]
+    ingesta = st.session_state.get("ingesta")
+    if ingesta is None:
+        # primera vez: los contadores se arman una sola vez desde el Parquet del histórico
+        base = leer_historico(path_cache, columnas=["date", "name", "id", "cantidad"])
+        ingesta = HistoricoIncremental.desde_historico(base)
+    filas = ingesta.agregar(leer_csv_ventas(file_bytes))
+    ingesta.guardar(ruta_ingesta(path_cache))
+    st.session_state["ingesta"] = ingesta
+    actualizar_desde_ingesta(ingesta)
+    return filas
 
 
-def update_graph_data():
-    # graph_orders = st.session_state.get("graph_orders").copy()
-    window = st.session_state["forecast_time_selector"] 
-    tmp = st.session_state.get("historico_ordenes").sort_values(by=["fecha"]).copy()
-    tmp["fecha"] = pd.to_datetime(tmp["fecha"])
-    time_dict = {"14 días":14, "1 mes":30, "3 meses":90}
-    window = time_dict[window]
-    if window == 14:
-       tmp = tmp.iloc[-(window+30):] 
-    elif window == 30:
-       tmp = tmp.iloc[-(window+60):] 
-    else:
-       tmp = tmp.iloc[-(window+90):] 
-    print(tmp.head())
-    st.session_state["graph_orders"] = tmp
-
 #=======================================================================
 
 def reload_all():    
@@ -270,11 +266,14 @@ def update_forecast():
         # st.info(".")
     window = st.session_state["forecast_time_selector"]
     if flag_historical_data and window != None: 
-        df = st.session_state.get("historical_data")
-        
-        actualizar_gestion_productos(df)
-        actualizar_prediccion()
-        update_graph_data()
+        aplicar_ventana()
+
+@st.fragment(run_every=1)
+def esperar_insight(tarea):
+    # solo este bloque se refresca mientras el modelo responde; al terminar, un rerun completo lo muestra
+    if tarea.done():
+        st.rerun()
+    st.caption("⏳ Generando insight con IA...")
 
 #===================================================================================
 set_params_demanda()
@@ -306,6 +305,16 @@ div[data-testid="stMetric"] {
 div[data-testid="stMetric"] > div {
     background-color: transparent !important;
 }
+
+/* El uploader de ventas nuevas (sidebar) sí se muestra */
+section[data-testid="stSidebar"] div[data-testid="stFileUploader"] {
+    position: static !important;
+    height: auto !important;
+    width: auto !important;
+    opacity: 1 !important;
+    pointer-events: auto !important;
+    float: none !important;
+}
 </style>
 """, unsafe_allow_html=True)
 # st.markdown(custom_css, unsafe_allow_html=True)
@@ -386,11 +395,22 @@ with cols[1]:
     components.html(button_html, height=70)
 
     if uploaded_file is not None:
-        dataframe = pd.read_csv(uploaded_file)
-        st.session_state["historico_ventas"] = dataframe.copy()
         st.session_state["upload_historical_data"] = True
         flag_historical_data = True
-        cargar_historico_ventas(dataframe)
+        # solo se procesa cuando cambia el archivo; la primera vez se convierte a Parquet
+        if st.session_state.get("historico_file_id") != uploaded_file.file_id:
+            path_cache = convertir_historico(uploaded_file.getvalue())
+            st.session_state["historico_file_id"] = uploaded_file.file_id
+            cargar_historico_ventas(path_cache)
+
+with st.sidebar:
+    if flag_historical_data:
+        # corte diario del POS: solo se procesan las filas posteriores a lo ya cargado
+        nuevas_ventas = st.file_uploader("➕ Agregar ventas nuevas (CSV)", key="uploader_incremental", type="csv")
+        if nuevas_ventas is not None and st.session_state.get("incremental_file_id") != nuevas_ventas.file_id:
+            filas = agregar_ventas_nuevas(nuevas_ventas.getvalue())
+            st.session_state["incremental_file_id"] = nuevas_ventas.file_id
+            st.success(f"{filas} ventas nuevas agregadas al histórico.")
         # st.write(dataframe)
 
 # st.header(f"📈 Demanda de los próximos {st.session_state.get('forecast_time')}")
@@ -523,50 +543,108 @@ edited_tmp = st.data_editor(
     },
 )
 
+# insumos requeridos por la tabla: se arman una vez por ventana; al editar un ajuste solo se suma
+# la receta de esa fila (edited_rows del editor), sin recalcular todos los productos
+bom = cargar_matriz()
+if bom is not None and gestion_productos is not None and not gestion_productos.empty:
+    req = st.session_state.get("requerimiento_insumos")
+    if req is None or req.bom is not bom or req.gestion is not gestion_productos:
+        req = RequerimientoIncremental(bom, gestion_productos)
+        st.session_state["requerimiento_insumos"] = req
+    req.aplicar_cambios(st.session_state.get("editor_tmp", {}).get("edited_rows", {}))
+    if req.editadas:
+        filas = sorted(req.editadas)
+        edited_tmp.iloc[filas, edited_tmp.columns.get_loc("Total")] = req.total_productos(filas)
+
+if flag_historical_data and window != None and "demanda_diaria" in st.session_state:
+    with st.expander("📅 Demanda diaria por producto", expanded=False):
+        # vistas sobre la matriz ya calculada: filtrar no recalcula nada
+        demanda = st.session_state["demanda_diaria"].primeros_dias(VENTANAS[window])
+        cols_filtro = st.columns([0.35, 0.65])
+        with cols_filtro[0]:
+            rango = st.date_input(
+                "Días",
+                value=(demanda.fechas[0].date(), demanda.fechas[-1].date()),
+                min_value=demanda.fechas[0].date(),
+                max_value=demanda.fechas[-1].date(),
+                key="rango_demanda_diaria",
+            )
+        with cols_filtro[1]:
+            seleccion = st.multiselect("Productos", options=demanda.nombres.tolist(), key="productos_demanda_diaria")
+        if isinstance(rango, (tuple, list)) and len(rango) == 2:
+            demanda = demanda.rango(rango[0], rango[1])
+        if seleccion:
+            ids_por_nombre = dict(zip(demanda.nombres, demanda.ids))
+            demanda = demanda.productos([ids_por_nombre[n] for n in seleccion])
+        st.dataframe(demanda.a_frame().round(1), hide_index=True)
 
 st.subheader("💡 Insight de la proyección (IA)")
 if window == None:
     st.info("Elija una ventan a de forecast")
 if flag_historical_data and window != None:
-    df_for_insight = edited_tmp.copy()
-    summary_rows = df_for_insight.head(20).to_dict(orient="records")
+    # resumen de toda la tabla + top-k por volumen y por ajuste, dentro del presupuesto de tokens
+    estimacion = edited_tmp["Estimacion"].to_numpy(dtype=float)
+    total = edited_tmp["Total"].to_numpy(dtype=float)
+    resumen = {
+        "productos": int(len(edited_tmp)),
+        "total_estimacion": round(float(estimacion.sum()), 1),
+        "total_ajustado": round(float(total.sum()), 1),
+        "productos_con_ajuste": int(np.count_nonzero(total != estimacion)),
+        "productos_sin_demanda": int(np.count_nonzero(total <= 0)),
+    }
+    tabla_insight = compactar_tabla(
+        edited_tmp,
+        ["Nombre", "Estimacion", "Ajuste de negocio(%)", "Total"],
+        resumen,
+        {"mayor_volumen": total, "mayor_ajuste": np.abs(total - estimacion)},
+    )
     today = datetime.now().strftime("%d/%m/%Y")
 
     prompt = (
         f"Fecha: {today}. Eres un planificador de demanda para restaurantes en Perú. "
-        f"Con base en el siguiente JSON de productos (estimación, ajustes y costo total), "
+        f"Con base en el siguiente JSON (resumen de todos los productos y los de mayor volumen o ajuste), "
         f"entrega 2 bullets de insight, máximo 30 palabras cada uno. "
         f"Considera feriados, fines de semana y días flojos.\n\n"
-        f"TABLA:\n{json.dumps(summary_rows, ensure_ascii=False)}"
+        f"TABLA:\n{tabla_insight}"
     )
 
 
     insights_state = st.session_state.get('insights', {})
 
-    time_dict = {"14 días":14, "1 mes":30, "3 meses":90}
-    tmp_window = time_dict[window]
+    tmp_window = VENTANAS[window]
     
     if not insights_state or tmp_window not in insights_state:
         st.warning("Datos de insights no disponibles para la ventana seleccionada. Cargando...")
 
     if len(insights_state[tmp_window]) == 0:
         if client:
-            try:
-                resp = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role":"system","content":"Eres un analista de demanda conciso y práctico."},
-                        {"role":"user","content":prompt},
-                    ],
-                    temperature=0.2,
-                    max_tokens=120,
-                )
-                out_message = resp.choices[0].message.content.strip()
-                insights_state[tmp_window] = out_message
-                st.session_state["insights"] = insights_state
-                st.write(out_message)
-            except Exception as e:
-                st.warning(f"No se pudo generar el insight: {e}")
+            messages = [
+                {"role":"system","content":"Eres un analista de demanda conciso y práctico."},
+                {"role":"user","content":prompt},
+            ]
+            # la llamada corre en segundo plano: la página termina de renderizar sin esperar al modelo
+            tarea = pedir_insight(
+                st.session_state,
+                "insight_demanda_tarea",
+                clave_tarea(tmp_window, messages),
+                chat_cacheado,
+                client,
+                insights_cache,
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.2,
+                max_tokens=120,
+            )
+            if tarea.done():
+                try:
+                    out_message = tarea.result()
+                    insights_state[tmp_window] = out_message
+                    st.session_state["insights"] = insights_state
+                    st.write(out_message)
+                except Exception as e:
+                    st.warning(f"No se pudo generar el insight: {e}")
+            else:
+                esperar_insight(tarea)
         else:
             st.info("Configura tu API_KEY en el .env para generar insights.")
     else:
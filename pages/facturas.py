@@ -2,18 +2,34 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import base64, os, json, re
-from io import BytesIO
-from lxml import etree
+import base64, os
 from dotenv import load_dotenv
-from openai import OpenAI
 import hashlib
+import queue
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from armonic.llm import obtener_cliente
+from armonic.cache_llm import cache_ocr, clave_llm
+from armonic.recetas import MatrizRecetas, RequerimientoIncremental, cargar_matriz
+from armonic.catalogo import cargar_catalogo
+from armonic.paginas_pdf import dividir_pdf, unir_paginas
+from armonic.imagen import AHORRO_EXTRA, VERSION_PREPROCESO, preparar_imagen
+from armonic.xml_ubl import COLUMNAS, iterar_lote, parse_xml
+from armonic.normalizacion import normalizar_items
+from armonic.plantillas import plantillas_proveedor, texto_pdf
+from armonic.json_incremental import LectorObjetosJSON
+from armonic.compra import TablaCompra
 
 # ================== CONFIG ==================
 load_dotenv()
-API_KEY = os.getenv("API_KEY")
-client = OpenAI(api_key=API_KEY) if API_KEY else None
+client = obtener_cliente()
 OPENAI_MODEL_VISION = "gpt-4o-mini"  # rápido y suficiente para este módulo
+TIMEOUT_OCR = 90  # segundos; las imágenes en detail=high tardan más que un insight
+MAX_FACTURAS_EN_PARALELO = 8  # igual al límite de llamadas simultáneas del cliente LLM
+# cache en disco compartido por todas las sesiones: la misma factura (mismo hash, prompt y modelo)
+# no vuelve a pasar por el modelo de visión
+ocr_cache = cache_ocr()
+# formato de detalle aprendido por proveedor (RUC) a partir de sus PDF confirmados
+plantillas = plantillas_proveedor()
 
 DATA_DIR = os.path.join(os.getcwd(), "data")
 RECETAS_PATH = os.path.join(DATA_DIR, "recetas_completas.csv")
@@ -23,25 +39,10 @@ st.title("🧾 Gestionar Compra desde la Factura")
 st.caption("Sube una factura (PDF/PNG/JPG/XML) y completa la tabla de compra usando IA + recetas.")
 
 # ================== UTILIDADES ==================
-def coerce_float(x):
-    if x in (None, "", " "):
-        return 0.0
-    if isinstance(x, (int, float)):
-        return float(x)
-    s = str(x).replace(",", ".")
-    s = re.sub(r"[^\d.\-]", "", s)
-    try:
-        return float(s)
-    except Exception:
-        return 0.0
-
 def to_data_url(file_bytes: bytes, mime: str) -> str:
     b64 = base64.b64encode(file_bytes).decode("utf-8")
     return f"data:{mime};base64,{b64}"
 
-def clean_str(s: str) -> str:
-    return re.sub(r"\s{2,}", " ", str(s or "").upper()).strip()
-
 @st.cache_data
 def cargar_recetas(path: str) -> pd.DataFrame:
     if not os.path.exists(path):
@@ -68,6 +69,18 @@ def cargar_recetas(path: str) -> pd.DataFrame:
     df["CONVERSION"] = 1.0  # placeholder, se puede ajustar más adelante
     return df[["PRODUCTO","INSUMO","UNIDAD","CANTIDAD","PRECIO_REFERENCIA","CONVERSION"]]
 
+def requerimiento_insumos(bom: MatrizRecetas) -> pd.Series:
+    # insumos para el horizonte elegido en Forecast: recetas (dispersa) x Total por producto,
+    # mantenidos por Forecast con los ajustes de negocio ya aplicados
+    gestion = st.session_state.get("gestion_productos")
+    if bom is None or gestion is None or gestion.empty:
+        return pd.Series(dtype=float)
+    req = st.session_state.get("requerimiento_insumos")
+    if req is None or req.bom is not bom or req.gestion is not gestion:
+        req = RequerimientoIncremental(bom, gestion)
+        st.session_state["requerimiento_insumos"] = req
+    return req.serie()
+
 # ================== OCR / XML ==================
 VISION_SYSTEM = (
     "Eres un experto en OCR de facturas y notas de pedido peruanas. "
@@ -104,10 +117,11 @@ VISION_USER = (
 
 
 
-def ocr_items_from_image(file_bytes: bytes, mime: str) -> pd.DataFrame:
+def ocr_items_from_image(file_bytes: bytes, mime: str, detail: str = "high", al_item=None) -> pd.DataFrame:
+    # respuesta en stream: cada ítem se entrega a `al_item` apenas se cierra su objeto JSON
     if client is None:
-        st.error("No hay API_KEY configurada para usar OCR por IA.")
-        return pd.DataFrame(columns=["descripcion","cantidad","pu","desc","importe","um"])
+        # corre en hilos del pool (sin st.*): el error se muestra en la línea de progreso del archivo
+        raise RuntimeError("No hay API_KEY configurada para usar OCR por IA.")
 
     data_url = to_data_url(file_bytes, mime)
     resp = client.chat.completions.create(
@@ -116,97 +130,228 @@ def ocr_items_from_image(file_bytes: bytes, mime: str) -> pd.DataFrame:
             {"role": "system", "content": VISION_SYSTEM},
             {"role": "user", "content": [
                 {"type": "text", "text": VISION_USER},
-                {"type": "image_url", "image_url": {"url": data_url, "detail": "high"}},
+                {"type": "image_url", "image_url": {"url": data_url, "detail": detail}},
             ]},
         ],
-        temperature=0
+        temperature=0,
+        timeout=TIMEOUT_OCR,
+        stream=True,
     )
-    content = resp.choices[0].message.content or "[]"
-
-    # recortar al JSON
-    start = min([i for i in [content.find("["), content.find("{")] if i != -1] or [0])
-    raw = content[start:]
-    end_br = max(raw.rfind("]"), raw.rfind("}"))
-    raw = raw[:end_br + 1] if end_br > 0 else raw
-
-    data = json.loads(raw)
-    if isinstance(data, dict):
-        data = [data]
-
+    lector = LectorObjetosJSON()
     rows = []
-    for r in data:
-        rows.append({
-            "proveedor": clean_str(r.get("proveedor", "")),
-            "descripcion": clean_str(r.get("descripcion", "")),
-            "cantidad": coerce_float(r.get("cantidad", 0)),
-            "pu":       coerce_float(r.get("pu", 0)),
-            "desc":     coerce_float(r.get("desc", 0)),
-            "importe":  coerce_float(r.get("importe", 0)),
-            "um":       str(r.get("um") or "").lower()
-        })
-
-    return pd.DataFrame(rows, columns=["proveedor","descripcion","cantidad","pu","desc","importe","um"])
+    fin = None
+    for chunk in resp:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if chunk.choices:
+            fin = getattr(chunk.choices[0], "finish_reason", None) or fin
+        for fila in lector.alimentar(delta or ""):
+            rows.append(fila)
+            if al_item is not None:
+                al_item(fila)
+
+    # montos/cantidades ("S/ 1,234.50", "3,20") y textos se normalizan por columna, no celda por celda
+    items = normalizar_items(pd.DataFrame(rows, columns=["proveedor","descripcion","cantidad","pu","desc","importe","um"]))
+    # respuesta cortada (p. ej. límite de tokens) u objetos mal formados: el detalle puede estar incompleto
+    items.attrs["incompleto"] = fin != "stop" or lector.descartados > 0 or lector.pendiente
+    return items
 
 
 def parse_invoice_xml(xml_bytes: bytes) -> pd.DataFrame:
-    parser = etree.XMLParser(recover=True, huge_tree=True)
-    root = etree.fromstring(xml_bytes, parser=parser)
-    ns = root.nsmap
-
-    def findall(expr):
-        try:
-            return root.findall(expr, namespaces=ns)
-        except Exception:
-            return []
-
-    rows = []
+    # streaming (iterparse + XPath precompilados), con la razón social de AccountingSupplierParty
+    return parse_xml(xml_bytes)
 
-    # UBL InvoiceLine
-    for line in findall(".//cac:InvoiceLine"):
-        desc = (
-            line.findtext(".//cbc:Description", namespaces=ns)
-            or line.findtext(".//cac:Item/cbc:Description", namespaces=ns)
-            or ""
-        )
-
-        qty_el = line.find(".//cbc:InvoicedQuantity", namespaces=ns)
-        qty = qty_el.text if qty_el is not None else "0"
-        um = qty_el.get("unitCode") if qty_el is not None else ""
-
-        price_el = line.find(".//cac:Price/cbc:PriceAmount", namespaces=ns)
-        pu = price_el.text if price_el is not None else "0"
-
-        # monto total de la línea si existe
-        line_total_el = line.find(".//cbc:LineExtensionAmount", namespaces=ns)
-        importe = line_total_el.text if line_total_el is not None else "0"
-
-        # descuento (si está detallado)
-        disc_el = line.find(".//cac:AllowanceCharge/cbc:Amount", namespaces=ns)
-        desc_monto = disc_el.text if disc_el is not None else "0"
-
-        rows.append({
-            "proveedor": "",  # no viene en XML
-            "descripcion": clean_str(desc),
-            "cantidad": coerce_float(qty),
-            "pu":       coerce_float(pu),
-            "desc":     coerce_float(desc_monto),
-            "importe":  coerce_float(importe),
-            "um":       (um or "").lower()
-        })
 
-    # fallback simple si no hay filas
-    if not rows:
-        return pd.DataFrame(columns=["proveedor","descripcion","cantidad","pu","desc","importe","um"])
+# ================== RECETAS ==================
+recetas_df = cargar_recetas(RECETAS_PATH)
 
-    return pd.DataFrame(rows, columns=["proveedor","descripcion","cantidad","pu","desc","importe","um"])
+with st.expander("Ver recetas base (PRODUCTO → INSUMO)", expanded=False):
+    st.dataframe(recetas_df, use_container_width=True)
 
+def ocr_cacheado(file_hash: str, file_bytes: bytes, mime: str, preparar: bool = False, al_item=None) -> pd.DataFrame:
+    # clave = hash del archivo original + prompts + modelo (+ versión del preprocesado y si usa
+    # OCR_AHORRO_EXTRA en imágenes): cambiar cualquiera invalida el cache; un acierto no paga ni el preprocesado
+    partes = [VISION_SYSTEM, VISION_USER, file_hash] + ([VERSION_PREPROCESO] if preparar else [])
+    params = {"ahorro_extra": AHORRO_EXTRA} if preparar else {}
+    clave = clave_llm(OPENAI_MODEL_VISION, partes, **params)
+    filas = ocr_cache.get(clave)
+    if filas is not None:
+        return pd.DataFrame(filas, columns=["proveedor","descripcion","cantidad","pu","desc","importe","um"])
+    detail = "high"
+    if preparar:
+        # gris, recortada al papel, a la resolución que usa el modelo y en JPEG; detail según densidad de texto
+        try:
+            file_bytes, mime, detail = preparar_imagen(file_bytes, ahorro_extra=AHORRO_EXTRA)
+        except OSError:
+            pass  # formato que Pillow no abre: se envía tal cual
+    items = ocr_items_from_image(file_bytes, mime, detail, al_item)
+    if not items.attrs["incompleto"]:
+        # un detalle incompleto no se guarda: la próxima subida vuelve a llamar al modelo
+        ocr_cache.set(clave, items.to_dict(orient="records"))
+    return items
+
+def ocr_pdf(file_hash: str, file_bytes: bytes, al_item=None) -> pd.DataFrame:
+    # una llamada por página, en paralelo (el cliente LLM limita la concurrencia total) y unidas en orden
+    paginas = dividir_pdf(file_bytes)
+    if len(paginas) == 1:
+        return ocr_cacheado(file_hash, file_bytes, "application/pdf", al_item=al_item)
+    with ThreadPoolExecutor(max_workers=min(MAX_FACTURAS_EN_PARALELO, len(paginas))) as ejecutor:
+        items = list(ejecutor.map(
+            lambda pagina: ocr_cacheado(hashlib.sha1(pagina).hexdigest(), pagina, "application/pdf", al_item=al_item),
+            paginas,
+        ))
+    unidas = unir_paginas(items)
+    unidas.attrs["incompleto"] = any(i.attrs.get("incompleto", False) for i in items)
+    return unidas
+
+def procesar_archivo(nombre: str, file_bytes: bytes, file_hash: str, al_item=None) -> pd.DataFrame:
+    # OCR o XML de un archivo; sin llamadas a st.* porque corre en el pool de hilos
+    # (`al_item` recibe cada ítem del OCR en cuanto el modelo lo termina de escribir)
+    ext = nombre.split(".")[-1].lower()
+    if ext == "xml":
+        items = parse_invoice_xml(file_bytes)
+    elif ext == "zip":
+        # lote de XML (export del contador): se lee en chunks, sin cargar todo el ZIP como árboles. La
+        # página sí guarda el lote completo (es el detalle editable), así que cada chunk pasa su texto a
+        # strings de Arrow al llegar: ~1/3 de la memoria de los str de Python (bench_xml, modo "detalle")
+        texto = {col: "string[pyarrow]" for col in ["proveedor", "descripcion", "um", "archivo"]}
+        chunks = [chunk.astype(texto) for chunk in iterar_lote(file_bytes)]
+        items = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=COLUMNAS + ["archivo"])
+    elif ext == "pdf":
+        # PDF con texto de un proveedor recurrente: su plantilla lo lee local y sin modelo de visión
+        items = plantillas.extraer(texto_pdf(file_bytes))
+        if items is None:
+            items = ocr_pdf(file_hash, file_bytes, al_item)
+        else:
+            items.attrs["origen"] = "plantilla"
+    else:
+        mime = "image/png" if ext == "png" else "image/jpeg"
+        items = ocr_cacheado(file_hash, file_bytes, mime, preparar=True, al_item=al_item)
+
+    # recalcular importe SIEMPRE aquí; el del documento se conserva (oculto) para aprender plantillas
+    items["importe_documento"] = items["importe"].astype(float)
+    items["cantidad"] = items["cantidad"].astype(float)
+    items["pu"] = items["pu"].astype(float)
+    items["importe"] = items["cantidad"] * items["pu"]
+    items["archivo"] = nombre + "/" + items["archivo"] if "archivo" in items.columns else nombre
+    return items
+
+def vista_previa(vista, en_vivo: dict):
+    # ítems recibidos hasta ahora (filas del stream o detalle final de los archivos ya terminados)
+    partes = [
+        normalizar_items(pd.DataFrame(items, columns=["proveedor","descripcion","cantidad","pu","desc","importe","um","archivo"]))
+        if isinstance(items, list) else items
+        for items in en_vivo.values() if len(items)
+    ]
+    if partes:
+        vista.dataframe(pd.concat(partes, ignore_index=True), hide_index=True)
+
+def procesar_facturas(archivos: list) -> dict:
+    """{hash: items} de los archivos subidos. Los que aún no se procesaron en la sesión corren en
+    paralelo (pool acotado) con una línea de progreso por archivo: el tiempo total se acerca al del
+    archivo más lento, no a la suma. Un archivo con error queda como None hasta que se vuelva a subir.
+
+    Mientras corren, los ítems que el OCR va terminando (stream) se muestran en una vista previa
+    del detalle; la tabla editable aparece cuando terminan todos."""
+    procesadas = st.session_state["facturas_procesadas"]
+    pendientes = {}
+    for archivo in archivos:
+        file_bytes = archivo.getvalue()
+        file_hash = hashlib.sha1(file_bytes).hexdigest()
+        if file_hash not in procesadas and file_hash not in pendientes:
+            pendientes[file_hash] = (archivo.name, file_bytes)
+
+    if pendientes:
+        barra = st.progress(0.0, text=f"Procesando {len(pendientes)} factura(s)...")
+        lineas = {}
+        for file_hash, (nombre, _) in pendientes.items():
+            lineas[file_hash] = st.empty()
+            lineas[file_hash].caption(f"⏳ {nombre}")
+        # los hilos solo encolan (sin st.*); la vista previa se redibuja desde este hilo
+        cola = queue.Queue()
+        vista = st.empty()
+        en_vivo = {file_hash: [] for file_hash in pendientes}  # hash -> ítems recibidos o detalle final
+        with ThreadPoolExecutor(max_workers=min(MAX_FACTURAS_EN_PARALELO, len(pendientes))) as ejecutor:
+            futuros = {
+                ejecutor.submit(
+                    procesar_archivo, nombre, file_bytes, file_hash,
+                    lambda fila, file_hash=file_hash, nombre=nombre: cola.put((file_hash, dict(fila, archivo=nombre))),
+                ): file_hash
+                for file_hash, (nombre, file_bytes) in pendientes.items()
+            }
+            en_curso, n = set(futuros), 0
+            while en_curso:
+                listos, en_curso = wait(en_curso, timeout=0.2, return_when=FIRST_COMPLETED)
+                nuevos = 0
+                while not cola.empty():
+                    file_hash, fila = cola.get()
+                    if isinstance(en_vivo[file_hash], list):
+                        en_vivo[file_hash].append(fila)
+                        nuevos += 1
+                for futuro in listos:
+                    n += 1
+                    file_hash = futuros[futuro]
+                    nombre = pendientes[file_hash][0]
+                    try:
+                        procesadas[file_hash] = futuro.result()
+                        en_vivo[file_hash] = procesadas[file_hash]
+                        origen = " (plantilla del proveedor)" if procesadas[file_hash].attrs.get("origen") == "plantilla" else ""
+                        if procesadas[file_hash].attrs.get("incompleto"):
+                            lineas[file_hash].caption(
+                                f"⚠️ {nombre}: {len(procesadas[file_hash])} ítems, respuesta del modelo incompleta "
+                                "(revisa el detalle; no se guarda en el cache de OCR)"
+                            )
+                        else:
+                            lineas[file_hash].caption(f"✅ {nombre}: {len(procesadas[file_hash])} ítems{origen}")
+                    except Exception as e:
+                        procesadas[file_hash] = None
+                        en_vivo[file_hash] = []
+                        lineas[file_hash].error(f"❌ {nombre}: {e}")
+                    barra.progress(n / len(pendientes), text=f"{n}/{len(pendientes)} facturas procesadas")
+                if (nuevos or listos) and en_curso:
+                    vista_previa(vista, en_vivo)
+        vista.empty()
+    return procesadas
+
+def aprender_plantillas(archivos: list, items: pd.DataFrame):
+    # el detalle confirmado (OCR + correcciones del usuario) de cada PDF con texto enseña o
+    # refuerza la plantilla de su proveedor; una plantilla que no reproduce el detalle no se guarda
+    # (volver a confirmar el mismo archivo no suma confirmaciones: cuentan hashes distintos).
+    # El importe es el que trae el documento, no cantidad x pu recalculado (kilos, descuentos, redondeo)
+    if not archivos or "archivo" not in items.columns:
+        return
+    if "importe_documento" in items.columns:
+        items = items.assign(importe=items["importe_documento"].fillna(items["importe"]))
+    for archivo in archivos:
+        filas = items[items["archivo"] == archivo.name]
+        if archivo.name.lower().endswith(".pdf") and not filas.empty:
+            datos = archivo.getvalue()
+            plantillas.aprender(texto_pdf(datos), filas, hashlib.sha1(datos).hexdigest())
 
 # ================== BUILD BASE Q_ESTIMACION POR INSUMO ==================
-# ================== RECETAS (solo para referencia visual) ==================
-recetas_df = cargar_recetas(RECETAS_PATH)
+bom = cargar_matriz(RECETAS_PATH)
+catalogo = cargar_catalogo(RECETAS_PATH)
+requerimiento = requerimiento_insumos(bom)
+
+if not requerimiento.empty:
+    with st.expander("🧮 Requerimiento de insumos (recetas × forecast)", expanded=False):
+        st.dataframe(bom.a_frame(requerimiento.to_numpy()).round(3), hide_index=True)
+        if "demanda_diaria" in st.session_state:
+            # mismo producto matricial sobre la matriz producto x día del pronóstico
+            demanda = st.session_state["demanda_diaria"]
+            diario = pd.DataFrame(
+                bom.requerimientos(demanda.ids, demanda.valores),
+                columns=demanda.fechas.strftime("%d/%m"),
+            )
+            diario.insert(0, "id_insumo", bom.insumos)
+            st.caption("Requerimiento diario (sin ajustes de negocio)")
+            st.dataframe(diario.round(3), hide_index=True)
+else:
+    st.caption("Carga el histórico de ventas en Forecast para estimar los insumos a partir de las recetas.")
 
-with st.expander("Ver recetas base (PRODUCTO → INSUMO)", expanded=False):
-    st.dataframe(recetas_df, use_container_width=True)
+def estimar_q(ids_insumo: pd.Series) -> pd.Series:
+    # Q_ESTIMACION = requerimiento del insumo asignado a la línea; 0 si no tiene insumo o no hay forecast
+    ids = pd.to_numeric(ids_insumo, errors="coerce")
+    return pd.Series(requerimiento.reindex(ids).to_numpy(), index=ids_insumo.index).fillna(0.0).round(3)
 
 if "factura_hash" not in st.session_state:
     st.session_state["factura_hash"] = None
@@ -214,13 +359,15 @@ if "items_factura_df" not in st.session_state:
     st.session_state["items_factura_df"] = pd.DataFrame(
         columns=["proveedor","descripcion","cantidad","pu","desc","importe","um"]
     )
+if "facturas_procesadas" not in st.session_state:
+    st.session_state["facturas_procesadas"] = {}
 
 # ================== UI: SUBIR FACTURA ==================
-st.subheader("1) Subir factura")
+st.subheader("1) Subir facturas")
 uploaded = st.file_uploader(
-    "Factura / boleta (PDF, PNG, JPG o XML)",
-    type=["pdf","png","jpg","jpeg","xml"],
-    accept_multiple_files=False,
+    "Facturas / boletas (PDF, PNG, JPG, XML o ZIP de XML), una o varias",
+    type=["pdf","png","jpg","jpeg","xml","zip"],
+    accept_multiple_files=True,
 )
 
 items_df = pd.DataFrame(columns=["proveedor","descripcion","cantidad","pu","desc","importe","um"])
@@ -229,39 +376,29 @@ items_df["cantidad"] = items_df["cantidad"].astype(float)
 items_df["pu"] = items_df["pu"].astype(float)
 items_df["importe"] = items_df["cantidad"] * items_df["pu"]
 
-if uploaded is not None:
-    ext = uploaded.name.split(".")[-1].lower()
-    file_bytes = uploaded.read()
-
-    # hash del archivo para saber si es nuevo
-    file_hash = hashlib.sha1(file_bytes).hexdigest()
+if uploaded:
+    # cada archivo se procesa una sola vez por sesión (por hash); el conjunto subido define el detalle
+    procesadas = procesar_facturas(uploaded)
+    hashes = list(dict.fromkeys(hashlib.sha1(a.getvalue()).hexdigest() for a in uploaded))
+    st.session_state["facturas_procesadas"] = {h: procesadas[h] for h in hashes}
+    file_hash = "|".join(hashes)
 
-    # solo reprocesar si cambió el archivo
+    # solo rearmar si cambió el conjunto de archivos
     if st.session_state["factura_hash"] != file_hash:
-        if ext == "xml":
-            items_df = parse_invoice_xml(file_bytes)
+        partes = [procesadas[h] for h in hashes if procesadas[h] is not None]
+        if partes:
+            # un solo detalle para todas las facturas, agrupado por proveedor (orden de subida dentro de cada uno)
+            items_df = pd.concat(partes, ignore_index=True).sort_values("proveedor", kind="stable", ignore_index=True)
         else:
-            mime = (
-                "application/pdf" if ext == "pdf"
-                else "image/png" if ext == "png"
-                else "image/jpeg"
-            )
-            items_df = ocr_items_from_image(file_bytes, mime)
+            items_df = pd.DataFrame(columns=["proveedor","descripcion","cantidad","pu","desc","importe","um"])
 
-        # recalcular importe SIEMPRE aquí
-        items_df["cantidad"] = items_df["cantidad"].astype(float)
-        items_df["pu"] = items_df["pu"].astype(float)
-        items_df["importe"] = items_df["cantidad"] * items_df["pu"]
-
-        # nuevo doc: actualizar hash y detalle
+        # nuevo conjunto: actualizar hash y detalle
         st.session_state["factura_hash"] = file_hash
         st.session_state["items_factura_df"] = items_df.copy()
 
-        # importante: resetear tabla Gestionar Compra
-        if "gc_input_df" in st.session_state:
-            del st.session_state["gc_input_df"]
-        if "entradas_insumos_df" in st.session_state:
-            del st.session_state["entradas_insumos_df"]
+        # importante: resetear tabla Gestionar Compra (la comparten Facturación y Proveedores)
+        if "tabla_compra" in st.session_state:
+            del st.session_state["tabla_compra"]
     else:
         # misma factura que antes => reutiliza el OCR previo
         items_df = st.session_state["items_factura_df"].copy()
@@ -287,7 +424,8 @@ if items_df is not None and not items_df.empty:
                 options=UM_OPTIONS,
                 required=True,
                 default="kg",
-            )
+            ),
+            "importe_documento": None,  # solo para aprender plantillas
         },
     )
 
@@ -302,18 +440,21 @@ else:
 # ================== TABLA GESTIONAR COMPRA (SOLO ÍTEMS FACTURA) ==================
 st.subheader("2) Tabla Gestionar Compra")
 
-if items_df.empty and "gc_input_df" not in st.session_state:
+if items_df.empty and "tabla_compra" not in st.session_state:
     st.warning("Aún no hay datos de factura. Carga una para comenzar.")
 else:
-    # 1) Construir input inicial solo 1 vez (o cuando hay factura nueva)
-    if "gc_input_df" not in st.session_state and not items_df.empty:
+    # 1) Construir la tabla solo 1 vez (o cuando hay factura nueva)
+    if "tabla_compra" not in st.session_state and not items_df.empty:
         base_df = items_df.copy()
         base_df["PRODUCTO"] = base_df["descripcion"].str.upper().str.strip()
 
-        # Q_ESTIMACION random solo la PRIMERA vez
-        base_df["Q_ESTIMACION"] = base_df["cantidad"].apply(
-            lambda x: np.random.randint(max(10, int(x)), max(20, int(x) + 20))
-        )
+        # insumo de la receta asociado a cada línea: mapeo confirmado o el más parecido por trigramas
+        # (se corrige en la tabla); Q_ESTIMACION sale de recetas x forecast
+        if catalogo is not None:
+            base_df["ID_INSUMO"] = catalogo.resolver_lote(base_df["PRODUCTO"])["id_insumo"].to_numpy()
+        else:
+            base_df["ID_INSUMO"] = pd.Series(pd.NA, index=base_df.index, dtype="Int64")
+        base_df["Q_ESTIMACION"] = estimar_q(base_df["ID_INSUMO"])
 
         # Proveedor inicial: del OCR si lo tienes, si no default
         base_df["PROVEEDOR"] = base_df["proveedor"].replace("", "LOS CABALLOS")
@@ -326,32 +467,28 @@ else:
         base_df["PRECIO_MERCADO"] = base_df["PRECIO_HISTORICO"]
         base_df["AJUSTE_MERMAS"] = 0.05
 
-        gc_input_df = base_df[[
-            "PRODUCTO",
-            "Q_ESTIMACION",
-            "PROVEEDOR",
-            "PRECIO_HISTORICO",
-            "UNIDAD",
-            "ENTRADAS: CANTIDAD INSUMOS",
-            "PRECIO_MERCADO",
-            "AJUSTE_MERMAS",
-        ]].copy()
+        # un id estable por línea y las derivadas (MONTO_ESTIMADO, PRESUPUESTO, MONTO_REAL, DIF) ya calculadas
+        st.session_state["tabla_compra"] = TablaCompra(base_df)
 
-        st.session_state["gc_input_df"] = gc_input_df
+    tabla = st.session_state["tabla_compra"]
 
-    else:
-        # Ya existe → usar lo que el usuario dejó la última vez
-        gc_input_df = st.session_state["gc_input_df"].copy()
-
-    # 2) Recalcular columnas derivadas SIEMPRE a partir de las editables
-    df_gc = gc_input_df.copy()
-    df_gc["MONTO_ESTIMADO"] = df_gc["Q_ESTIMACION"] * df_gc["PRECIO_HISTORICO"]
-    df_gc["PRESUPUESTO"] = df_gc["MONTO_ESTIMADO"] * (1 + df_gc["AJUSTE_MERMAS"])
-    df_gc["MONTO_REAL"] = df_gc["ENTRADAS: CANTIDAD INSUMOS"] * df_gc["PRECIO_MERCADO"]
-    df_gc["DIF"] = df_gc["PRESUPUESTO"] - df_gc["MONTO_REAL"]
+    # 2) Aplicar lo editado en el rerun anterior: solo esas filas recalculan sus derivadas
+    cambios = tabla.aplicar_cambios("editor_gc_factura", st.session_state.get("editor_gc_factura"))
+    # línea con insumo recién asignado/cambiado => su Q_ESTIMACION pasa a ser el requerimiento por recetas
+    cambio_insumo = [
+        id_fila for id_fila, columnas in cambios.items()
+        if "ID_INSUMO" in columnas and id_fila in tabla.frame.index and pd.notna(tabla.frame.at[id_fila, "ID_INSUMO"])
+    ]
+    if cambio_insumo:
+        tabla.asignar(cambio_insumo, "Q_ESTIMACION", estimar_q(tabla.frame.loc[cambio_insumo, "ID_INSUMO"]).to_numpy())
+        if catalogo is not None:
+            # la elección del usuario queda como mapeo confirmado para próximas facturas (todas las sesiones)
+            for descripcion, id_insumo in tabla.frame.loc[cambio_insumo, ["PRODUCTO", "ID_INSUMO"]].itertuples(index=False):
+                catalogo.confirmar(descripcion, id_insumo)
 
     cols_gc = [
         "PRODUCTO",
+        "ID_INSUMO",
         "Q_ESTIMACION",
         "PROVEEDOR",
         "PRECIO_HISTORICO",
@@ -364,10 +501,9 @@ else:
         "MONTO_REAL",
         "DIF",
     ]
-    df_gc = df_gc[cols_gc]
 
-    edited_gc = st.data_editor(
-        df_gc,
+    st.data_editor(
+        tabla.vista("editor_gc_factura", cols_gc),
         hide_index=True,
         num_rows="dynamic",
         key="editor_gc_factura",
@@ -377,29 +513,22 @@ else:
             "MONTO_REAL",
             "DIF",
         ],  # ✅ estas columnas no se pueden editar
+        column_config={
+            "ID_INSUMO": st.column_config.SelectboxColumn(
+                "ID_INSUMO",
+                help=(
+                    "Insumo de la receta al que corresponde la línea; define Q_ESTIMACION. "
+                    "Si la descripción no se confirmó antes es solo una propuesta: el insumo de mayor costo "
+                    "del plato de la receta con nombre más parecido. Corrígelo y queda guardado."
+                ),
+                options=[] if bom is None else bom.insumos.tolist(),
+            )
+        },
     )
 
-    # 3) Guardar SOLO las columnas editables para el siguiente rerun
-    editable_cols = [
-        "PRODUCTO",
-        "Q_ESTIMACION",
-        "PROVEEDOR",
-        "PRECIO_HISTORICO",
-        "UNIDAD",
-        "ENTRADAS: CANTIDAD INSUMOS",
-        "PRECIO_MERCADO",
-        "AJUSTE_MERMAS",
-    ]
-    st.session_state["gc_input_df"] = edited_gc[editable_cols].copy()
-
-    # 4) Lo que necesita proveedores.py
-    st.session_state["entradas_insumos_df"] = edited_gc[
-        ["PRODUCTO", "PROVEEDOR", "Q_ESTIMACION",
-         "ENTRADAS: CANTIDAD INSUMOS", "PRESUPUESTO", "MONTO_REAL", "DIF"]
-    ].copy()
-
-    total_presupuesto = float(edited_gc["PRESUPUESTO"].sum())
+    total_presupuesto = float(tabla.frame["PRESUPUESTO"].sum())
     st.metric("Presupuesto total", f"{total_presupuesto:,.2f}")
 
     if st.button("➡️ GESTIONAR COMPRA"):
+        aprender_plantillas(uploaded, st.session_state["items_factura_df"])
         st.switch_page("pages/proveedores.py")
@@ -2,53 +2,79 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import os, json, re
+import json
 from datetime import datetime
 from dotenv import load_dotenv
-from openai import OpenAI
+from armonic.cache_llm import cache_insights, chat_cacheado
+from armonic.llm import obtener_cliente
+from armonic.insights_bg import clave_tarea, pedir_insight
+from armonic.prompt_compacto import compactar_tabla
+from armonic.compra import TablaCompra
 
 load_dotenv()
-API_KEY = os.getenv("API_KEY")
-client = OpenAI(api_key=API_KEY) if API_KEY else None
+client = obtener_cliente()
+# cache en disco compartido por todas las sesiones: los reruns (checkbox, filtros) con la misma tabla
+# no vuelven a llamar al modelo
+insights_cache = cache_insights()
 
 st.set_page_config(page_title="Armonic — Entradas de Mercadería", page_icon="📦", layout="wide")
 st.title("📦 Entradas de Mercadería")
 st.caption("Compara el presupuesto vs las entradas reales de insumos por proveedor y selecciona qué incluir en el presupuesto final.")
 
 # -------- utils --------
-def _coerce_float(x):
-    if x in (None, "", " "):
-        return 0.0
-    if isinstance(x, (int, float)):
-        return float(x)
-    s = str(x).replace(",", ".")
-    s = re.sub(r"[^\d.\-]", "", s)
-    try:
-        return float(s)
-    except Exception:
-        return 0.0
-
 def _save_downloads(df: pd.DataFrame, name: str):
     csv = df.to_csv(index=False).encode("utf-8")
     json_bytes = json.dumps(df.to_dict(orient="records"), ensure_ascii=False, indent=2).encode("utf-8")
     st.download_button("⬇️ CSV", data=csv, file_name=f"{name}.csv", mime="text/csv")
     st.download_button("⬇️ JSON", data=json_bytes, file_name=f"{name}.json", mime="application/json")
 
-def llm_insight_from_table(df: pd.DataFrame, proveedor: str) -> str:
-    if client is None or df.empty:
+@st.fragment(run_every=1)
+def esperar_insight(tarea):
+    # solo este bloque se refresca mientras el modelo responde; al terminar, un rerun completo lo muestra
+    if tarea.done():
+        st.rerun()
+    st.caption("⏳ Generando insights con IA...")
+
+def tabla_para_insight(df: pd.DataFrame) -> str:
+    # estadísticas de toda la tabla + top-k filas por costo, DIF y sobrecosto: el prompt no crece con los insumos
+    presupuesto = df["PRESUPUESTO"].to_numpy(dtype=float)
+    monto_real = df["MONTO_REAL"].to_numpy(dtype=float)
+    dif = df["DIF"].to_numpy(dtype=float)
+    sobrecosto = monto_real - presupuesto
+    resumen = {
+        "insumos": int(len(df)),
+        "total_presupuesto": round(float(np.nansum(presupuesto)), 2),
+        "total_monto_real": round(float(np.nansum(monto_real)), 2),
+        "total_dif": round(float(np.nansum(dif)), 2),
+        "con_sobrecosto": int(np.count_nonzero(sobrecosto > 0)),
+        "sobrecosto_total": round(float(np.nansum(np.maximum(sobrecosto, 0))), 2),
+        "con_faltante": int(np.count_nonzero(df["ENTRADAS: CANTIDAD INSUMOS"].to_numpy(dtype=float) < df["Q_ESTIMACION"].to_numpy(dtype=float))),
+    }
+    columnas = ["PRODUCTO", "PROVEEDOR", "Q_ESTIMACION", "ENTRADAS: CANTIDAD INSUMOS", "PRESUPUESTO", "MONTO_REAL", "DIF"]
+    return compactar_tabla(
+        df,
+        columnas,
+        resumen,
+        {"mayor_costo": presupuesto, "mayor_dif": np.abs(dif), "mayor_sobrecosto": sobrecosto},
+    )
+
+def llm_insight_from_table(tabla: str, proveedor: str) -> str:
+    if client is None or not tabla:
         return "Configura tu API_KEY o carga datos para ver insights."
     today = datetime.now().strftime("%d/%m/%Y")
-    sample = df.to_dict(orient="records")
     prompt = (
         f"Fecha actual: {today}. Eres analista logístico de una pyme restaurante en Perú. "
         f"Proveedor filtrado: {proveedor}. "
-        f"Con base en esta tabla JSON (producto, estimación, entradas de insumos, presupuesto, monto real y dif), "
+        f"Con base en este JSON (resumen de todos los insumos y los de mayor costo, dif o sobrecosto: "
+        f"producto, estimación, entradas de insumos, presupuesto, monto real y dif), "
         f"nota que las entradas de insumos son UNIDADES, no son kg, ni g, ni litros. "
         f"Da 2–3 insights muy concisos (<35 palabras cada uno) sobre: "
         f"sobrecostos, riesgo de faltantes y recomendación de ajustar compras o cambiar proveedor.\n\n"
-        f"TABLA:\n{json.dumps(sample, ensure_ascii=False)}"
+        f"TABLA:\n{tabla}"
     )
-    resp = client.chat.completions.create(
+    return chat_cacheado(
+        client,
+        insights_cache,
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": "Eres un analista logístico muy conciso y práctico."},
@@ -57,47 +83,34 @@ def llm_insight_from_table(df: pd.DataFrame, proveedor: str) -> str:
         temperature=0.25,
         max_tokens=180,
     )
-    return resp.choices[0].message.content.strip()
 
-# -------- cargar data desde facturas.py --------
-if "entradas_insumos_df" in st.session_state:
-    df = st.session_state["entradas_insumos_df"].copy()
+# -------- tabla de compra compartida con facturas.py --------
+# es el mismo objeto que edita Facturación (ids de fila estables y derivadas ya calculadas): aquí no se copia
+if "tabla_compra" in st.session_state:
+    tabla = st.session_state["tabla_compra"]
 else:
     st.info("Aún no se cargaron facturas en la página de Facturación. Usando demo de entradas.")
-    df = pd.DataFrame({
-        "PRODUCTO": ["PAPA", "CHULETA", "POLLO", "CHORIZO"],
-        "PROVEEDOR": ["LOS CABALLOS"] * 4,
-        "Q_ESTIMACION": [40, 15, 20, 10],
-        "ENTRADAS: CANTIDAD INSUMOS": [90, 100, 90, 90],
-        "PRESUPUESTO": [210, 63, 105, 63],
-        "MONTO_REAL": [0, 0, 0, 0],
-        "DIF": [210, 63, 105, 63],
-    })
-
-# si no vino PROVEEDOR desde facturas.py, ponemos uno por defecto
-if "PROVEEDOR" not in df.columns:
-    df["PROVEEDOR"] = "LOS CABALLOS"
-
-# asegurar columnas numéricas
-for col in ["Q_ESTIMACION", "ENTRADAS: CANTIDAD INSUMOS", "PRESUPUESTO", "MONTO_REAL", "DIF"]:
-    if col not in df.columns:
-        df[col] = 0.0
-    df[col] = df[col].apply(_coerce_float)
-
-# columna para check de inclusión en presupuesto
-if "INCLUIR" not in df.columns:
-    df["INCLUIR"] = True
+    if "tabla_compra_demo" not in st.session_state:
+        st.session_state["tabla_compra_demo"] = TablaCompra(pd.DataFrame({
+            "PRODUCTO": ["PAPA", "CHULETA", "POLLO", "CHORIZO"],
+            "PROVEEDOR": ["LOS CABALLOS"] * 4,
+            "Q_ESTIMACION": [40, 15, 20, 10],
+            "PRECIO_HISTORICO": [5, 4, 5, 6],
+            "ENTRADAS: CANTIDAD INSUMOS": [90, 100, 90, 90],
+            "PRECIO_MERCADO": [0, 0, 0, 0],
+        }))
+    tabla = st.session_state["tabla_compra_demo"]
+
+# lo editado en el rerun anterior (INCLUIR, cantidades, proveedor...): solo esas filas se recalculan
+tabla.aplicar_cambios("editor_entradas_proveedor", st.session_state.get("editor_entradas_proveedor"))
 
 # -------- filtro por proveedor --------
-proveedores = df["PROVEEDOR"].fillna("SIN PROVEEDOR").unique().tolist()
+proveedores = tabla.frame["PROVEEDOR"].fillna("SIN PROVEEDOR").unique().tolist()
 col_filtro, _ = st.columns([1, 3])
 with col_filtro:
     proveedor_sel = st.selectbox("Filtro: Proveedor", options=["Todos"] + proveedores)
 
-if proveedor_sel != "Todos":
-    df_filtrado = df[df["PROVEEDOR"] == proveedor_sel].copy()
-else:
-    df_filtrado = df.copy()
+filas_sel = tabla.frame["PROVEEDOR"] == proveedor_sel if proveedor_sel != "Todos" else None
 
 # -------- tabla editable --------
 st.subheader("Entradas de Mercadería (por proveedor filtrado)")
@@ -112,13 +125,13 @@ cols_order = [
     "MONTO_REAL",
     "DIF",
 ]
-df_filtrado = df_filtrado[cols_order]
 
 edited = st.data_editor(
-    df_filtrado,
+    tabla.vista("editor_entradas_proveedor", cols_order, filas_sel),
     hide_index=True,
     key="editor_entradas_proveedor",
     num_rows="dynamic",
+    disabled=["PRESUPUESTO", "MONTO_REAL", "DIF"],  # derivadas de precios y cantidades
     column_config={
         "INCLUIR": st.column_config.CheckboxColumn(
             "✔ Incluir",
@@ -127,20 +140,6 @@ edited = st.data_editor(
     },
 )
 
-# actualizar estado global con lo editado (para no perder cambios)
-df_update = df.copy()
-# hacemos merge por PRODUCTO+PROVEEDOR para actualizar INCLUIR, MONTO_REAL, DIF, etc.
-df_update = df_update.drop(columns=["INCLUIR"], errors="ignore")
-edited_no_idx = edited.drop(columns=[], errors="ignore")
-df_merged = df_update.merge(
-    edited_no_idx,
-    on=["PRODUCTO", "PROVEEDOR", "Q_ESTIMACION",
-        "ENTRADAS: CANTIDAD INSUMOS", "PRESUPUESTO", "MONTO_REAL", "DIF"],
-    how="right",
-)
-# en la práctica, con pocos datos, esto funciona; si quieres algo más robusto, se puede ajustar luego
-st.session_state["entradas_insumos_df"] = edited.copy()
-
 # considerar sólo filas con INCLUIR = True para métricas / insights / descargas
 if "INCLUIR" in edited.columns:
     filtered = edited[edited["INCLUIR"] == True].copy()
@@ -163,8 +162,25 @@ else:
 st.markdown("---")
 st.subheader("💡 Insights logísticos")
 
-insight = llm_insight_from_table(filtered if not filtered.empty else edited, proveedor_sel)
-st.write(insight)
+df_insight = filtered if not filtered.empty else edited
+tabla_insight = tabla_para_insight(df_insight) if not df_insight.empty else ""
+# el insight se genera en segundo plano: métricas y descargas no esperan al modelo;
+# si el usuario cambia filtros/checks antes de que responda, la tarea anterior se descarta
+tarea = pedir_insight(
+    st.session_state,
+    "insight_proveedor_tarea",
+    clave_tarea(proveedor_sel, tabla_insight),
+    llm_insight_from_table,
+    tabla_insight,
+    proveedor_sel,
+)
+if tarea.done():
+    try:
+        st.write(tarea.result())
+    except Exception as e:
+        st.warning(f"No se pudo generar el insight: {e}")
+else:
+    esperar_insight(tarea)
 
 # -------- descargas --------
 st.markdown("---")